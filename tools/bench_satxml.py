@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Benchmark the satellites.xml hot paths off-box.
+
+Reports wall time and peak Python memory for load, list build, live-tuner
+match, validation, insert, delete, full and incremental save, the startup snapshot and the compact model on
+synthetic files:
+
+    python3 tools/bench_satxml.py --scales 1 10 100
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from CiefpSatelliteXmlEditor.satxml import (loadSatellites, formatSatellite, formatTransponder, writeSatellitesXml,
+                                            writeSatellitesModel)
+from CiefpSatelliteXmlEditor.compact import loadCompact
+from CiefpSatelliteXmlEditor.snapshot import saveSnapshot, loadSnapshot
+from CiefpSatelliteXmlEditor.validate import validateModel
+from gen_satellites_xml import generateSatellites
+
+OPERATIONS = 500
+
+
+def measure(fn):
+    # Vrijeme bez tracemalloc, zatim drugi prolaz samo za vrh memorije
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def benchScale(scale, workdir, seed):
+    path = os.path.join(workdir, f"satellites-{scale}x.xml")
+    writeSatellitesXml(generateSatellites(scale, seed), path)
+    rnd = random.Random(seed)
+    model = loadSatellites(path)
+    sats = model.satellites()
+
+    def load():
+        loadSatellites(path)
+
+    def buildList():
+        rows = []
+        for sat in model.satellites():
+            rows.append((formatSatellite(sat, True), sat))
+            rows.extend([(formatTransponder(trans), trans) for trans in sat.findall("transponder")])
+
+    def match():
+        for _ in range(OPERATIONS):
+            sat = rnd.choice(sats)
+            transponders = sat.findall("transponder")
+            if not transponders:
+                continue
+            key = model.transKeys[rnd.choice(transponders)]
+            data = {"frequency": key[0] + rnd.randint(-2, 2), "symbol_rate": key[1], "polarization": key[2],
+                    "fec_inner": key[3], "system": key[4], "modulation": key[5], "is_id": key[6]}
+            model.findTransponder(model.findSatellite(int(sat.get("position"))), data)
+
+    def validate():
+        validateModel(model)
+
+    def insert():
+        for _ in range(OPERATIONS):
+            trans = ET.Element("transponder", {"frequency": str(rnd.randint(10700, 12750) * 1000), "symbol_rate": "27500000",
+                                               "polarization": "0", "fec_inner": "3", "system": "0", "modulation": "1"})
+            model.addTransponder(rnd.choice(sats), trans)
+
+    def delete():
+        transponders = list(model.parents)
+        for trans in rnd.sample(transponders, min(OPERATIONS, len(transponders))):
+            model.removeTransponder(trans)
+
+    def save():
+        writeSatellitesXml(model.root, os.path.join(workdir, "saved.xml"))
+
+    incremental_path = os.path.join(workdir, "saved-incremental.xml")
+    writeSatellitesXml(model.root, incremental_path)
+    incremental = loadSatellites(incremental_path)
+
+    def saveIncremental():
+        # Jedan promijenjeni satelit, ostali se kopiraju iz izvorne datoteke
+        incremental.markDirty(incremental.satellites()[0])
+        writeSatellitesModel(incremental, incremental_path)
+
+    snapshot_path = os.path.join(workdir, "satellites.snapshot")
+
+    def snapshotSave():
+        saveSnapshot(model, path, snapshot_path)
+
+    def snapshotLoad():
+        loadSnapshot(path, snapshot_path)
+
+    compact = loadCompact(path)
+
+    def compactLoad():
+        loadCompact(path)
+
+    def compactSave():
+        compact.save(os.path.join(workdir, "saved-compact.xml"))
+
+    results = []
+    for name, fn in (("load", load), ("list build", buildList), ("match", match), ("validate", validate),
+                     ("insert", insert), ("delete", delete), ("save", save), ("save 1 dirty", saveIncremental),
+                     ("snap save", snapshotSave), ("snap load", snapshotLoad),
+                     ("compact load", compactLoad), ("compact save", compactSave)):
+        results.append((name,) + measure(fn))
+    return os.path.getsize(path), model.transponderCount(), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark satellites.xml core operations")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--dir", help="keep generated files here instead of a temp dir")
+    args = parser.parse_args()
+    workdir = args.dir or tempfile.mkdtemp(prefix="satxml-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    print(f"{'scale':>5} {'transponders':>12} {'operation':<12} {'time ms':>10} {'peak KiB':>10}")
+    for scale in args.scales:
+        size, count, results = benchScale(scale, workdir, args.seed)
+        for name, elapsed, peak in results:
+            print(f"{scale:>4}x {count:>12} {name:<12} {elapsed * 1000:>10.1f} {peak // 1024:>10}")
+        print(f"      file size {size // 1024} KiB, {OPERATIONS} ops for match/insert/delete")
+    if not args.dir:
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Off-box checks for the pure Python parts of the plugin.
+
+The background worker is driven through a stand-in for eTimer and the model
+code runs on generated data, so none of it needs a receiver or enigma:
+
+    python3 tools/check_core.py
+"""
+import copy
+import os
+import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from CiefpSatelliteXmlEditor.satxml import (SatellitesModel, findDuplicates, formatTransponder, iterXmlLines,
+                                            loadSatellites, readSatellitesXml, writeSatellitesModel,
+                                            writeSatellitesXml)
+from CiefpSatelliteXmlEditor.worker import BackgroundWorker
+from CiefpSatelliteXmlEditor.history import History, InsertOp, DeleteOp, AttribOp, ReorderOp, BatchOp
+from CiefpSatelliteXmlEditor.watcher import reloadChanged
+from CiefpSatelliteXmlEditor.merge import mergeSatellites
+from CiefpSatelliteXmlEditor.lamedb import decodeSatelliteParams, iterLamedbTransponders
+from CiefpSatelliteXmlEditor.snapshot import loadSatellitesCached, loadSnapshot
+from CiefpSatelliteXmlEditor.compact import loadCompact
+from CiefpSatelliteXmlEditor.validate import validateModel
+from CiefpSatelliteXmlEditor.search import SearchIndex, orbitalPosition, parseQuery
+from gen_satellites_xml import generateSatellites
+
+
+class FakeTimer:
+    """Zamjena za eTimer: callback lista, start/stop; poll se poziva rucno."""
+
+    def __init__(self):
+        self.callback = []
+        self.active = False
+
+    def start(self, interval, single_shot=False):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+
+def xmlText(root):
+    return "\n".join(iterXmlLines(root))
+
+
+def runToEnd(worker):
+    worker.thread.join()
+    worker.poll()
+
+
+def checkWorker(workdir):
+    events = []
+    worker = BackgroundWorker(FakeTimer)
+    release = threading.Event()
+
+    def job(progress):
+        progress(10)
+        progress(60)
+        release.wait()
+        return 42
+
+    worker.start("Loading", job, lambda value: events.append(("done", value)),
+                 lambda e: events.append(("error", e)), lambda percent: events.append(("progress", percent)))
+    assert worker.running and worker.timer.active
+    while not events:
+        worker.poll()
+    # Vise poruka napretka u jednom prolazu: prikazuje se samo zadnja
+    assert events == [("progress", 60)] or events == [("progress", 10)], events
+    release.set()
+    runToEnd(worker)
+    assert events[-1] == ("done", 42), events
+    assert not worker.running and not worker.timer.active
+
+    def failing(progress):
+        raise ValueError("broken xml")
+
+    worker.start("Saving", failing, lambda value: events.append(("done", value)), lambda e: events.append(("error", e)))
+    runToEnd(worker)
+    kind, error = events[-1]
+    assert kind == "error" and isinstance(error, ValueError) and not worker.running
+
+    # cancel(): rezultat posla koji jos radi se odbacuje
+    release = threading.Event()
+    count = len(events)
+    worker.start("Loading", lambda progress: release.wait() and 1, lambda value: events.append(("done", value)))
+    worker.cancel()
+    release.set()
+    runToEnd(worker)
+    assert len(events) == count and not worker.running and not worker.timer.active
+
+
+def checkHistory(workdir):
+    model = SatellitesModel(ET.ElementTree(generateSatellites(1, seed=3)))
+    original = xmlText(model.root)
+    history = History()
+    sats = model.satellites()
+    trans = sats[0][0]
+    ops = [AttribOp(trans, dict(trans.attrib), dict(trans.attrib, symbol_rate="12345000")),
+           DeleteOp(sats[1], 0, sats[1][0]),
+           ReorderOp(sats[2], sats[2].findall("transponder"), list(reversed(sats[2].findall("transponder")))),
+           BatchOp("two", [InsertOp(sats[3], 0, ET.Element("transponder", {"frequency": "10700000"})),
+                           DeleteOp(model.root, 0, sats[0])])]
+    for op in ops:
+        history.record(op)
+        op.apply(model)
+    edited = xmlText(model.root)
+    while history.undoLabel():
+        history.undo(model)
+    assert xmlText(model.root) == original
+    # Satelit vracen undoom mora se ponovno zapisati (izmjena prije brisanja)
+    assert sats[0] in model.dirty
+    while history.redoLabel():
+        history.redo(model)
+    assert xmlText(model.root) == edited
+    assert model.transponderCount() == len(model.root.findall("sat/transponder"))
+
+
+def checkReload(workdir):
+    path = os.path.join(workdir, "satellites.xml")
+    writeSatellitesXml(generateSatellites(1, seed=4), path)
+    model = loadSatellites(path)
+    sats = model.satellites()
+    local, external, untouched = sats[0], sats[1], sats[2]
+    local[0].set("symbol_rate", "12345000")
+    model.updateTransponder(local[0])
+
+    # Drugi program mijenja prvi i drugi satelit
+    root = ET.parse(path).getroot()
+    root[0][0].set("polarization", "3")
+    root[1][0].set("polarization", "3")
+    writeSatellitesXml(root, path)
+    signature, tree, hashes = readSatellitesXml(path)
+    result = reloadChanged(model, signature, tree, hashes)
+    assert result.conflicts == [local] and [old for old, new in result.replaced] == [external]
+    assert model.root[0] is local and local[0].get("symbol_rate") == "12345000"
+    assert model.root[1] is not external and model.root[1][0].get("polarization") == "3"
+    assert model.root[2] is untouched and model.isModified()
+    assert model.transponderCount() == len(model.root.findall("sat/transponder"))
+
+
+def checkMerge(workdir):
+    base = generateSatellites(1, seed=5)
+    local = copy.deepcopy(base)
+    upstream = copy.deepcopy(base)
+    local[0][0].set("symbol_rate", "12345000")
+    upstream[1][0].set("polarization", "3")
+    upstream.insert(3, ET.Element("sat", {"name": "New", "flags": "0", "position": "1799"}))
+    result = mergeSatellites(base, local, upstream)
+    merged = result.root
+    assert not result.conflicts
+    assert merged[0][0].get("symbol_rate") == "12345000" and merged[1][0].get("polarization") == "3"
+    assert merged[3].get("name") == "New" and len(merged) == len(base) + 1
+
+    # Isti transponder (isti kljuc) razlicito promijenjen na obje strane: ostaje lokalna verzija
+    local[2][0].set("pls_code", "1")
+    upstream[2][0].set("pls_code", "2")
+    result = mergeSatellites(base, local, upstream)
+    assert len(result.conflicts) == 1 and result.conflicts[0][3].get("pls_code") == "1"
+
+
+def checkLamedb(workdir):
+    position, attrs = decodeSatelliteParams("12000000:22000000:1:3:192:2:0:1:2:0:2:7:8:1")
+    assert position == 192 and attrs["system"] == "1" and attrs["is_id"] == "7" and attrs["pls_mode"] == "1"
+    position, attrs = decodeSatelliteParams("11000000:27500000:0:3:3550:2:0")
+    assert position == -50 and attrs["system"] == "0" and "is_id" not in attrs
+    assert decodeSatelliteParams("11000000:27500000:0") is None
+    assert decodeSatelliteParams("a:b:c:d:e:f:g") is None
+
+    lamedb5 = os.path.join(workdir, "lamedb5")
+    with open(lamedb5, "w") as f:
+        f.write("eDVB services /5/\n"
+                "t:00c00000:0003:0085,s:10800000:22000000:1:3:192:2:0:1:2:0:2\n"
+                "t:00eeee00:0001:0001,c:0:0\n"
+                's:0001:00c00000:0001:0085:1:0,"Foo",p:x\n')
+    assert [position for position, attrs in iterLamedbTransponders(lamedb5)] == [192]
+
+    lamedb4 = os.path.join(workdir, "lamedb")
+    with open(lamedb4, "w") as f:
+        f.write("eDVB services /4/\ntransponders\n00c00000:0003:0085\n"
+                "\ts 10800000:22000000:1:3:192:2:0\n/\nend\nservices\ns 1:2:3:4:5:6:7\nend\n")
+    assert [position for position, attrs in iterLamedbTransponders(lamedb4)] == [192]
+
+
+def checkSnapshot(workdir):
+    path = os.path.join(workdir, "snapshot.xml")
+    snapshot_path = os.path.join(workdir, "satellites.snapshot")
+    writeSatellitesXml(generateSatellites(1, seed=6), path)
+    cold = loadSatellitesCached(path, snapshot_path)
+    warm = loadSnapshot(path, snapshot_path)
+    assert warm is not None and sorted(warm.transKeys.values()) == sorted(cold.transKeys.values())
+    assert warm.sourceHashes == cold.sourceHashes and warm.source == cold.source
+    # Promijenjena datoteka ponistava snapshot
+    writeSatellitesXml(generateSatellites(1, seed=7), path)
+    assert loadSnapshot(path, snapshot_path) is None
+
+
+def checkCompact(workdir):
+    path = os.path.join(workdir, "compact.xml")
+    writeSatellitesXml(generateSatellites(1, seed=8), path)
+    loaded = loadSatellites(path)
+    compact = loadCompact(path)
+    rows = [compact.formatRow(sat, i) for sat in compact.sats for i in range(len(sat))]
+    assert rows == [formatTransponder(trans) for trans in loaded.root.findall("sat/transponder")]
+    # Prijelaz na uredjivanje: isti sadrzaj, a spremanje kopira sve nepromijenjene satelite
+    model = compact.toModel()
+    assert xmlText(model.root) == xmlText(loaded.root) and not model.isModified()
+    model.satellites()[0][0].set("symbol_rate", "12345000")
+    model.updateTransponder(model.satellites()[0][0])
+    assert writeSatellitesModel(model, path) == len(model.root) - 1
+    # Datoteka promijenjena nakon pregleda: model se ucitava iz nje, ne iz starog popisa
+    model = compact.toModel()
+    assert model.satellites()[0][0].get("symbol_rate") == "12345000"
+
+
+def checkSearch(workdir):
+    assert orbitalPosition("19.2E") == "192" and orbitalPosition("5.0w") == "-50" and orbitalPosition("13E") == "130"
+    assert orbitalPosition("Hot") is None
+    root = ET.Element("satellites")
+    for name, position in (("19.2E Astra 1KR/1L/1M/1N", "192"), ("13.0E Hot Bird 13B/13C/13E", "130"),
+                           ("5.0W Eutelsat 5 West B", "-50"), ("1.9E BulgariaSat 1", "19")):
+        sat = ET.SubElement(root, "sat", {"name": name, "flags": "0", "position": position})
+        ET.SubElement(sat, "transponder", {"frequency": "11000000", "symbol_rate": "27500000", "polarization": "0",
+                                           "fec_inner": "3", "system": "0", "modulation": "1"})
+    index = SearchIndex(SatellitesModel(ET.ElementTree(root)))
+
+    def names(text):
+        return [sat.get("name").split()[0] for sat, matches in index.search(parseQuery(text))]
+
+    assert names("sat:19.2E") == ["19.2E"] and names("5.0W") == ["5.0W"] and names("192") == ["19.2E"]
+    assert names("-50") == ["5.0W"] and names("hot bird") == ["13.0E"] and names("19") == ["19.2E", "1.9E"]
+
+
+def checkDuplicates(workdir):
+    root = ET.Element("satellites")
+    sat = ET.SubElement(root, "sat", {"name": "Test", "flags": "0", "position": "192"})
+    mis = {"frequency": "11000000", "symbol_rate": "30000000", "polarization": "0", "fec_inner": "3",
+           "system": "1", "modulation": "2", "is_id": "5", "pls_mode": "1"}
+    # Isti MIS transponder s drugim pls_code nije duplikat; isti pls_code jest (i unutar tolerancije)
+    ET.SubElement(sat, "transponder", dict(mis, pls_code="1"))
+    ET.SubElement(sat, "transponder", dict(mis, pls_code="2"))
+    ET.SubElement(sat, "transponder", dict(mis, pls_code="1"))
+    ET.SubElement(sat, "transponder", dict(mis, frequency="11002000", pls_code="2"))
+    model = SatellitesModel(ET.ElementTree(root))
+    result = validateModel(model)
+    flagged = [trans for trans in sat if any("duplicate" in text for level, text in result.issues.get(trans, ()))]
+    assert flagged == [sat[2]], flagged
+    assert findDuplicates(model, sat) == [sat[2], sat[3]]
+
+
+CHECKS = (("worker", checkWorker), ("history", checkHistory), ("reload", checkReload), ("merge", checkMerge),
+          ("lamedb", checkLamedb), ("snapshot", checkSnapshot), ("compact", checkCompact), ("search", checkSearch),
+          ("duplicates", checkDuplicates))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, check in CHECKS:
+            check(workdir)
+            print(f"{name:10} ok")
+
+
+if __name__ == "__main__":
+    main()
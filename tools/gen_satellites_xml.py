@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Generate a synthetic satellites.xml for benchmarking.
+
+Scale 1 approximates a full community list (150 positions, ~10k transponders);
+scale 10 and 100 multiply the transponder count.
+
+    python3 tools/gen_satellites_xml.py --scale 10 -o /tmp/satellites-10x.xml
+"""
+import argparse
+import os
+import random
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CiefpSatelliteXmlEditor.satxml import writeSatellitesXml
+
+BASE_SATELLITES = 150
+BASE_TRANSPONDERS = 70  # po satelitu
+MAX_SATELLITES = 3000
+
+
+def orbitalName(position):
+    return f"{abs(position) / 10:.1f}{'E' if position >= 0 else 'W'}"
+
+
+def generateSatellites(scale=1, seed=1):
+    rnd = random.Random(seed)
+    sat_count = min(BASE_SATELLITES * scale, MAX_SATELLITES)
+    per_sat = BASE_TRANSPONDERS * BASE_SATELLITES * scale // sat_count
+    positions = rnd.sample(range(-1800, 1800), sat_count)
+    positions.sort(reverse=True)
+    root = ET.Element("satellites")
+    for i, position in enumerate(positions):
+        sat = ET.SubElement(root, "sat", {"name": f"{orbitalName(position)} Synthetic {i}", "flags": "1", "position": str(position)})
+        count = rnd.randint(per_sat // 3, per_sat * 5 // 3)
+        freqs = sorted(rnd.randint(10700, 12750) for _ in range(count))
+        for freq in freqs:
+            dvbs2 = rnd.random() < 0.6
+            attrs = {
+                "frequency": str(freq * 1000),
+                "symbol_rate": str(rnd.choice((2000, 7200, 22000, 27500, 30000, 45000)) * 1000),
+                "polarization": str(rnd.randint(0, 1)),
+                "fec_inner": str(rnd.choice((2, 3, 4, 9)) if dvbs2 else rnd.randint(1, 5)),
+                "system": "1" if dvbs2 else "0",
+                "modulation": str(rnd.choice((1, 2, 4))) if dvbs2 else "1",
+            }
+            if dvbs2 and rnd.random() < 0.08:
+                attrs["is_id"] = str(rnd.randint(1, 255))
+                attrs["pls_code"] = str(rnd.randint(0, 262141))
+                attrs["pls_mode"] = str(rnd.randint(0, 1))
+            if rnd.random() < 0.02:
+                attrs["t2mi_plp_id"] = str(rnd.randint(0, 255))
+                attrs["t2mi_pid"] = str(rnd.randint(32, 8190))
+            ET.SubElement(sat, "transponder", attrs)
+    return root
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic satellites.xml")
+    parser.add_argument("--scale", type=int, default=1, help="1, 10 or 100 times a full list")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", default="satellites.xml")
+    args = parser.parse_args()
+    root = generateSatellites(args.scale, args.seed)
+    writeSatellitesXml(root, args.output)
+    print(f"Wrote {args.output}: {len(root)} satellites, {len(root.findall('sat/transponder'))} transponders")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Compact, array-backed satellites list for the low-memory browse mode.
+
+Each satellite packs the six tuning fields into typed arrays; MIS, T2-MI and
+any other attribute are kept sparsely per row. Display strings and tuning
+keys are derived on demand. The browser only reads this model; editing
+(undo, validation, search and the external-change reload all work on
+ElementTree elements) starts from toModel(), which builds the full
+SatellitesModel once.
+"""
+from array import array
+from bisect import bisect_right
+import os
+import xml.etree.ElementTree as ET
+
+from .satxml import (TRANSPONDER_ATTRS, SatellitesModel, blockHashes, escapeXml, fileSignature, formatTransponder,
+                     loadSatellites, writeXmlLines)
+
+MISSING = -1  # atribut nije prisutan ili nije kanonski cijeli broj
+WIDE_ATTRS = ("frequency", "symbol_rate")
+
+
+class CompactSatellite:
+    __slots__ = ("attrib", "frequency", "symbol_rate", "polarization", "fec_inner", "system", "modulation", "extra")
+
+    def __init__(self, attrib):
+        self.attrib = attrib
+        self.frequency = array("i")
+        self.symbol_rate = array("i")
+        self.polarization = array("b")
+        self.fec_inner = array("b")
+        self.system = array("b")
+        self.modulation = array("b")
+        self.extra = {}  # red -> ((atribut, vrijednost), ...)
+
+    def __len__(self):
+        return len(self.frequency)
+
+    def pack(self, attrib):
+        packed = []
+        extra = []
+        for attr in TRANSPONDER_ATTRS:
+            value = attrib.get(attr)
+            if value is not None and value.isdigit() and (value == "0" or value[0] != "0") and \
+                    (attr in WIDE_ATTRS or int(value) < 128):
+                packed.append(int(value))
+            else:
+                packed.append(MISSING)
+                if value is not None:
+                    extra.append((attr, value))
+        for attr, value in attrib.items():
+            if attr not in TRANSPONDER_ATTRS:
+                extra.append((attr, value))
+        return packed, tuple(extra)
+
+    def append(self, attrib):
+        self.insert(len(self), attrib)
+
+    def insert(self, index, attrib):
+        packed, extra = self.pack(attrib)
+        if index < len(self) and self.extra:
+            self.extra = {(row + 1 if row >= index else row): value for row, value in self.extra.items()}
+        for attr, value in zip(TRANSPONDER_ATTRS, packed):
+            getattr(self, attr).insert(index, value)
+        if extra:
+            self.extra[index] = extra
+
+    def delete(self, index):
+        for attr in TRANSPONDER_ATTRS:
+            del getattr(self, attr)[index]
+        self.extra.pop(index, None)
+        if self.extra:
+            self.extra = {(row - 1 if row > index else row): value for row, value in self.extra.items()}
+
+    def update(self, index, attrib):
+        self.delete(index)
+        self.insert(index, attrib)
+
+    def items(self, index):
+        result = []
+        overrides = ()
+        extra = self.extra.get(index, ())
+        if extra:
+            overrides = dict(extra)
+        for attr in TRANSPONDER_ATTRS:
+            value = getattr(self, attr)[index]
+            if value != MISSING:
+                result.append((attr, str(value)))
+            elif attr in overrides:
+                result.append((attr, overrides[attr]))
+        result.extend([(attr, value) for attr, value in extra if attr not in TRANSPONDER_ATTRS])
+        return result
+
+    def get(self, index, name, default=None):
+        if name in TRANSPONDER_ATTRS:
+            value = getattr(self, name)[index]
+            if value != MISSING:
+                return str(value)
+        for attr, value in self.extra.get(index, ()):
+            if attr == name:
+                return value
+        return default
+
+    def key(self, index):
+        # Isto kao satxml.transponderKey, bez parsiranja stringova
+        is_id = self.get(index, "is_id", "0")
+        return (max(self.frequency[index], 0) // 1000,
+                max(self.symbol_rate[index], 0) // 1000,
+                max(self.polarization[index], 0),
+                max(self.fec_inner[index], 0),
+                max(self.system[index], 0),
+                max(self.modulation[index], 0),
+                max(int(is_id), 0) if is_id.lstrip("-").isdigit() else 0)
+
+    def view(self, index):
+        return TransponderView(self, index)
+
+    def findInsertIndex(self, frequency):
+        # Isto pravilo kao satxml.findInsertIndex: iza svih s manjom ili jednakom frekvencijom
+        return bisect_right(self.frequency, frequency)
+
+
+class TransponderView:
+    """Read-only Element-like view of one row; invalid after insert/delete in its satellite."""
+    __slots__ = ("sat", "index")
+
+    def __init__(self, sat, index):
+        self.sat = sat
+        self.index = index
+
+    def get(self, name, default=None):
+        return self.sat.get(self.index, name, default)
+
+    def items(self):
+        return self.sat.items(self.index)
+
+
+class CompactModel:
+    def __init__(self, tag="satellites", attrib=None):
+        self.tag = tag
+        self.attrib = attrib or {}
+        self.sats = []
+        self.path = None
+        self.source = None  # fileSignature datoteke iz koje je model ucitan
+
+    def transponderCount(self):
+        return sum(len(sat) for sat in self.sats)
+
+    def formatRow(self, sat, index):
+        return formatTransponder(sat.view(index))
+
+    def addTransponder(self, sat, attrib):
+        index = sat.findInsertIndex(int(attrib.get("frequency", "0")))
+        sat.insert(index, attrib)
+        return index
+
+    def iterXmlLines(self):
+        # Isti izlaz kao satxml.iterXmlLines za stablo sat/transponder
+        yield f"<{self.tag}{formatAttrs(self.attrib.items())}>"
+        for sat in self.sats:
+            attrs = formatAttrs(sat.attrib.items())
+            if not len(sat):
+                yield f"\t<sat{attrs}/>"
+                continue
+            yield f"\t<sat{attrs}>"
+            for index in range(len(sat)):
+                yield f"\t\t<transponder{formatAttrs(sat.items(index))}/>"
+            yield "\t</sat>"
+        yield f"</{self.tag}>"
+
+    def save(self, path):
+        writeXmlLines(self.iterXmlLines(), path)
+
+    def toTree(self):
+        root = ET.Element(self.tag, self.attrib)
+        for sat in self.sats:
+            sat_elem = ET.SubElement(root, "sat", sat.attrib)
+            for index in range(len(sat)):
+                ET.SubElement(sat_elem, "transponder", dict(sat.items(index)))
+        return ET.ElementTree(root)
+
+    def toModel(self, progress=None):
+        """SatellitesModel za uredjivanje; ako se datoteka u medjuvremenu promijenila, ucitava se iznova."""
+        signature = fileSignature(self.path)
+        if signature != self.source:
+            return loadSatellites(self.path, progress)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        tree = self.toTree()
+        model = SatellitesModel(tree)
+        # Hashevi blokova: spremanje prepisuje samo izmijenjene satelite, kao nakon obicnog ucitavanja
+        model.setSource(signature, blockHashes(data, list(tree.getroot())))
+        return model
+
+
+def formatAttrs(items):
+    return "".join([f' {key}="{escapeXml(value)}"' for key, value in items])
+
+
+def loadCompact(path, progress=None):
+    # iterparse: obradjeni <sat> se odmah brisu, cijelo stablo nikad nije u memoriji
+    model = None
+    root = None
+    sat = None
+    signature = fileSignature(path)
+    size = max(os.path.getsize(path), 1)
+    with open(path, "rb") as f:
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                    model = CompactModel(elem.tag, dict(elem.attrib))
+                elif elem.tag == "sat" and sat is None:
+                    sat = CompactSatellite(dict(elem.attrib))
+                    model.sats.append(sat)
+            elif elem.tag == "transponder" and sat is not None:
+                sat.append(elem.attrib)
+            elif elem.tag == "sat":
+                sat = None
+                root.clear()
+                if progress is not None:
+                    progress(min(f.tell(), size) * 100 // size)
+    model.path = path
+    model.source = signature
+    return model
@@ -0,0 +1,153 @@
+"""Undo/redo log of compact edit operations.
+
+Each entry stores only what it needs to be reversed: the parent and index of
+an inserted or deleted element (a deleted element keeps its own attributes),
+the before/after child order of a sorted satellite, or the before/after
+values of the attributes that actually changed. apply() and revert() return
+the affected (change, parent, element) triples so the reader can patch just
+those rows.
+"""
+UNDO_LIMIT = 500
+
+
+class InsertOp:
+    __slots__ = ("parent", "index", "elem")
+
+    def __init__(self, parent, index, elem):
+        self.parent = parent
+        self.index = index
+        self.elem = elem
+
+    def label(self):
+        return f"add {self.elem.tag}"
+
+    def apply(self, model):
+        model.insertElement(self.parent, self.index, self.elem)
+        return [("insert", self.parent, self.elem)]
+
+    def revert(self, model):
+        model.removeElement(self.parent, self.elem)
+        return [("remove", self.parent, self.elem)]
+
+
+class DeleteOp(InsertOp):
+    __slots__ = ()
+
+    def label(self):
+        return f"delete {self.elem.tag}"
+
+    def apply(self, model):
+        return InsertOp.revert(self, model)
+
+    def revert(self, model):
+        return InsertOp.apply(self, model)
+
+
+class AttribOp:
+    __slots__ = ("elem", "changes")
+
+    def __init__(self, elem, before, after):
+        self.elem = elem
+        # Samo promijenjeni atributi: {atribut: (prije, poslije)}, None = atribut ne postoji
+        self.changes = {attr: (before.get(attr), after.get(attr))
+                        for attr in set(before) | set(after) if before.get(attr) != after.get(attr)}
+
+    def label(self):
+        return f"edit {self.elem.tag}"
+
+    def setValues(self, model, side):
+        for attr, values in self.changes.items():
+            if values[side] is None:
+                self.elem.attrib.pop(attr, None)
+            else:
+                self.elem.set(attr, values[side])
+        model.updateTransponder(self.elem)
+        return [("update", None, self.elem)]
+
+    def apply(self, model):
+        return self.setValues(model, 1)
+
+    def revert(self, model):
+        return self.setValues(model, 0)
+
+
+class ReorderOp:
+    __slots__ = ("parent", "before", "after")
+
+    def __init__(self, parent, before, after):
+        self.parent = parent
+        self.before = before
+        self.after = after
+
+    def label(self):
+        return "sort"
+
+    def apply(self, model):
+        model.reorderTransponders(self.parent, self.after)
+        return [("reorder", self.parent, self.parent)]
+
+    def revert(self, model):
+        model.reorderTransponders(self.parent, self.before)
+        return [("reorder", self.parent, self.parent)]
+
+
+class BatchOp:
+    __slots__ = ("ops", "name")
+
+    def __init__(self, name, ops):
+        self.name = name
+        self.ops = ops
+
+    def label(self):
+        return self.name
+
+    def apply(self, model):
+        effects = []
+        for op in self.ops:
+            effects.extend(op.apply(model))
+        return effects
+
+    def revert(self, model):
+        effects = []
+        for op in reversed(self.ops):
+            effects.extend(op.revert(model))
+        return effects
+
+
+class History:
+    def __init__(self, limit=UNDO_LIMIT):
+        self.limit = limit
+        self.undoStack = []
+        self.redoStack = []
+
+    def record(self, op):
+        if isinstance(op, AttribOp) and not op.changes:
+            return
+        self.undoStack.append(op)
+        if len(self.undoStack) > self.limit:
+            del self.undoStack[0]
+        self.redoStack = []
+
+    def clear(self):
+        self.undoStack = []
+        self.redoStack = []
+
+    def undoLabel(self):
+        return self.undoStack[-1].label() if self.undoStack else None
+
+    def redoLabel(self):
+        return self.redoStack[-1].label() if self.redoStack else None
+
+    def undo(self, model):
+        if not self.undoStack:
+            return []
+        op = self.undoStack.pop()
+        self.redoStack.append(op)
+        return op.revert(model)
+
+    def redo(self, model):
+        if not self.redoStack:
+            return []
+        op = self.redoStack.pop()
+        self.undoStack.append(op)
+        return op.apply(model)
@@ -0,0 +1,130 @@
+"""Streaming lamedb / lamedb5 importer for DVB-S/S2 transponders.
+
+The file is read line by line; only satellite transponder records are
+decoded and the services section of lamedb (v4) is never read. New
+transponders are matched against the model's tuning-key index and inserted
+in frequency order under the satellite with the same orbital position.
+"""
+import os
+import xml.etree.ElementTree as ET
+
+from .satxml import FREQ_TOLERANCE, transponderKey
+
+LAMEDB_PATH = "/etc/enigma2/lamedb"
+LAMEDB5_PATH = "/etc/enigma2/lamedb5"
+
+
+def defaultLamedbPath():
+    return LAMEDB5_PATH if os.path.exists(LAMEDB5_PATH) else LAMEDB_PATH
+
+
+def decodeSatelliteParams(params):
+    """params: 'freq:sr:pol:fec:pos:inv:flags[:sys:mod:rolloff:pilot[:is_id:pls_code:pls_mode[:plp_id:pid]]]'"""
+    fields = params.split(":")
+    if len(fields) < 7:
+        return None
+    try:
+        values = [int(field) for field in fields]
+    except ValueError:
+        return None
+    position = values[4]
+    if position > 1800:
+        position -= 3600
+    attrs = {
+        "frequency": str(values[0]),
+        "symbol_rate": str(values[1]),
+        "polarization": str(values[2]),
+        "fec_inner": str(values[3]),
+        "system": str(values[7]) if len(values) > 7 else "0",
+        "modulation": str(values[8]) if len(values) > 8 else "1",
+    }
+    if len(values) > 13 and values[11] > 0:
+        attrs["is_id"] = str(values[11])
+        attrs["pls_code"] = str(values[12])
+        attrs["pls_mode"] = str(values[13])
+    if len(values) > 15 and values[14] >= 0:
+        attrs["t2mi_plp_id"] = str(values[14])
+        attrs["t2mi_pid"] = str(values[15])
+    return position, attrs
+
+
+def iterLamedbTransponders(path):
+    """Daje (orbital_position, atributi) za svaki DVB-S/S2 transponder."""
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        header = f.readline()
+        if "/5/" in header:
+            for line in f:
+                # t:namespace:tsid:onid,s:freq:sr:...
+                if line.startswith("t:"):
+                    params = line.rstrip().partition(",")[2]
+                    if params.startswith("s:"):
+                        decoded = decodeSatelliteParams(params[2:])
+                        if decoded:
+                            yield decoded
+            return
+        in_transponders = False
+        for line in f:
+            stripped = line.strip()
+            if not in_transponders:
+                in_transponders = stripped == "transponders"
+            elif stripped == "end":
+                break
+            elif stripped.startswith("s "):
+                decoded = decodeSatelliteParams(stripped[2:])
+                if decoded:
+                    yield decoded
+
+
+class ImportResult:
+    def __init__(self):
+        self.added = []
+        self.skipped = 0
+        self.conflicts = []  # (pozicija, atributi, razlog)
+
+    def summary(self):
+        lines = [f"Added: {len(self.added)}", f"Skipped (already present): {self.skipped}",
+                 f"Conflicting: {len(self.conflicts)}"]
+        for position, attrs, reason in self.conflicts[:10]:
+            lines.append(f"  {position} {int(attrs['frequency']) // 1000} MHz: {reason}")
+        if len(self.conflicts) > 10:
+            lines.append(f"  ... {len(self.conflicts) - 10} more")
+        return "\n".join(lines)
+
+
+def importLamedb(model, path=None):
+    return importTransponders(model, iterLamedbTransponders(path or defaultLamedbPath()))
+
+
+def importTransponders(model, records):
+    """records: (pozicija, atributi) iz iterLamedbTransponders; citanje datoteke moze biti u pozadinskoj dretvi."""
+    result = ImportResult()
+    for position, attrs in records:
+        sat = model.findSatellite(position)
+        if sat is None:
+            result.conflicts.append((position, attrs, "no <sat> for this position"))
+            continue
+        trans = ET.Element("transponder", attrs)
+        key = transponderKey(trans)
+        if key in model.transIndex[sat]:
+            result.skipped += 1
+            continue
+        # Blind scan frekvencija cesto odstupa par MHz od postojece
+        near = None
+        for delta in range(-FREQ_TOLERANCE, FREQ_TOLERANCE + 1):
+            for cand in model.freqIndex[sat].get(key[0] + delta, ()):
+                cand_key = model.transKeys[cand]
+                if cand_key[2] == key[2] and cand_key[6] == key[6]:
+                    near = cand_key
+                    if cand_key[1:] == key[1:]:
+                        break
+            if near and near[1:] == key[1:]:
+                break
+        if near is not None:
+            if near[1:] == key[1:]:
+                result.skipped += 1
+            else:
+                result.conflicts.append((position, attrs, f"differs from existing {near[0]} MHz {near[1]} kS/s"))
+            continue
+        model.addTransponder(sat, trans)
+        result.added.append(trans)
+    return result
@@ -0,0 +1,182 @@
+"""Keyed diff and three-way merge between satellites.xml versions.
+
+Satellites are keyed by position and transponders by their tuning key, so
+every version is turned into hash maps once and merged in a single pass.
+A missing base makes the merge a union of local and upstream.
+"""
+import os
+import xml.etree.ElementTree as ET
+
+from .satxml import SATELLITES_XML_PATH, transponderKey
+
+UPSTREAM_XML_PATH = "/tmp/satellites.xml"
+MERGE_BASE_PATH = SATELLITES_XML_PATH + ".base"
+
+
+def keyedSatellites(root):
+    """Vraca ({(pozicija, n): (sat, {(kljuc, n): transponder})}, redoslijed kljuceva satelita)."""
+    sats = {}
+    order = []
+    if root is None:
+        return sats, order
+    for sat in root.findall("sat"):
+        sat_key = (sat.get("position", "0"), 0)
+        while sat_key in sats:
+            sat_key = (sat_key[0], sat_key[1] + 1)
+        transponders = {}
+        for trans in sat.findall("transponder"):
+            key = (transponderKey(trans), 0)
+            while key in transponders:
+                key = (key[0], key[1] + 1)
+            transponders[key] = trans
+        sats[sat_key] = (sat, transponders)
+        order.append(sat_key)
+    return sats, order
+
+
+def attribs(elem):
+    return None if elem is None else dict(elem.attrib)
+
+
+def transpondersChanged(base_trans, other_trans):
+    return len(base_trans) != len(other_trans) or any(
+        attribs(trans) != attribs(base_trans.get(key)) for key, trans in other_trans.items())
+
+
+def mergeValue(base, local, upstream):
+    # Vraca (rezultat, konflikt)
+    if local == upstream:
+        return local, False
+    if local == base:
+        return upstream, False
+    if upstream == base:
+        return local, False
+    return local, True
+
+
+def diffSatellites(old_root, new_root):
+    """Kljucna razlika dvije verzije: [(pozicija, 'added'|'removed'|'changed', kljuc ili None)]."""
+    old, old_order = keyedSatellites(old_root)
+    new, new_order = keyedSatellites(new_root)
+    changes = []
+    for sat_key in old_order + [key for key in new_order if key not in old]:
+        old_sat, old_trans = old.get(sat_key, (None, {}))
+        new_sat, new_trans = new.get(sat_key, (None, {}))
+        if old_sat is None or new_sat is None:
+            changes.append((sat_key[0], "added" if old_sat is None else "removed", None))
+            continue
+        if attribs(old_sat) != attribs(new_sat):
+            changes.append((sat_key[0], "changed", None))
+        for key, trans in old_trans.items():
+            if key not in new_trans:
+                changes.append((sat_key[0], "removed", key[0]))
+            elif attribs(trans) != attribs(new_trans[key]):
+                changes.append((sat_key[0], "changed", key[0]))
+        for key in new_trans:
+            if key not in old_trans:
+                changes.append((sat_key[0], "added", key[0]))
+    return changes
+
+
+class MergeResult:
+    def __init__(self, root):
+        self.root = root
+        self.conflicts = []  # (pozicija, kljuc ili None, razlog, element u spojenom stablu ili None)
+        self.fromUpstream = 0
+        self.keptLocal = 0
+        self.upstreamData = None  # bajtovi spojenog upstreama, postaju baza nakon spremanja
+
+    def summary(self):
+        lines = [f"Upstream changes applied: {self.fromUpstream}", f"Local changes kept: {self.keptLocal}",
+                 f"Conflicts (local version kept): {len(self.conflicts)}"]
+        for position, key, reason, elem in self.conflicts[:10]:
+            where = f"{position} {key[0]} MHz" if key else position
+            lines.append(f"  {where}: {reason}")
+        if len(self.conflicts) > 10:
+            lines.append(f"  ... {len(self.conflicts) - 10} more")
+        return "\n".join(lines)
+
+
+def mergeSatellites(base_root, local_root, upstream_root):
+    base, base_order = keyedSatellites(base_root)
+    local, local_order = keyedSatellites(local_root)
+    upstream, upstream_order = keyedSatellites(upstream_root)
+    root = ET.Element(local_root.tag, dict(local_root.attrib))
+    result = MergeResult(root)
+
+    # Redoslijed: lokalni, a novi upstream sateliti iza najblizeg prethodnika koji postoji lokalno
+    following = {}  # lokalni kljuc (None = pocetak) -> novi upstream kljucevi iza njega
+    anchor = None
+    for sat_key in upstream_order:
+        if sat_key in local:
+            anchor = sat_key
+        else:
+            following.setdefault(anchor, []).append(sat_key)
+    order = following.get(None, [])
+    for sat_key in local_order:
+        order.append(sat_key)
+        order.extend(following.get(sat_key, ()))
+    placed = set(order)
+    order.extend([key for key in base_order if key not in placed])
+
+    for sat_key in order:
+        base_sat, base_trans = base.get(sat_key, (None, {}))
+        local_sat, local_trans = local.get(sat_key, (None, {}))
+        upstream_sat, upstream_trans = upstream.get(sat_key, (None, {}))
+        position = sat_key[0]
+        sat_attrib, conflict = mergeValue(attribs(base_sat), attribs(local_sat), attribs(upstream_sat))
+        if sat_attrib is None:
+            # Obrisan na jednoj strani; ako je druga strana mijenjala satelit, zadrzi njenu verziju
+            other_sat, other_trans = (local_sat, local_trans) if local_sat is not None else (upstream_sat, upstream_trans)
+            if other_sat is None or (not conflict and not transpondersChanged(base_trans, other_trans)):
+                if local_sat is not None:
+                    result.fromUpstream += 1
+                continue
+            sat = ET.SubElement(root, "sat", attribs(other_sat))
+            for trans in other_trans.values():
+                ET.SubElement(sat, "transponder", attribs(trans))
+            result.conflicts.append((position, None, "satellite deleted on one side, changed on the other", None))
+            continue
+        if conflict:
+            result.conflicts.append((position, None, "satellite changed on both sides", None))
+        sat = ET.SubElement(root, "sat", sat_attrib)
+
+        merged = []
+        upstream_added = False
+        for key in list(local_trans) + [key for key in upstream_trans if key not in local_trans] + \
+                [key for key in base_trans if key not in local_trans and key not in upstream_trans]:
+            local_attrib = attribs(local_trans.get(key))
+            upstream_attrib = attribs(upstream_trans.get(key))
+            value, conflict = mergeValue(attribs(base_trans.get(key)), local_attrib, upstream_attrib)
+            if local_attrib != upstream_attrib:
+                if value == upstream_attrib and not conflict:
+                    result.fromUpstream += 1
+                    upstream_added |= key not in local_trans
+                else:
+                    result.keptLocal += 1
+            if value is not None:
+                merged.append((key, value, conflict))
+        if upstream_added:
+            merged.sort(key=lambda item: item[0][0][0])
+        for key, value, conflict in merged:
+            trans = ET.SubElement(sat, "transponder", value)
+            if conflict:
+                result.conflicts.append((position, key[0], "changed on both sides", trans))
+    return result
+
+
+def loadRoot(path):
+    if path and os.path.exists(path):
+        return ET.parse(path).getroot()
+    return None
+
+
+def mergeUpstream(local_root, upstream_path=UPSTREAM_XML_PATH, base_path=MERGE_BASE_PATH):
+    # Upstream se cita jednom; baza za sljedeci merge mora biti upravo ova verzija, ne kasnija datoteka
+    if not os.path.exists(upstream_path):
+        raise IOError(f"{upstream_path} not found")
+    with open(upstream_path, "rb") as f:
+        data = f.read()
+    result = mergeSatellites(loadRoot(base_path), local_root, ET.fromstring(data))
+    result.upstreamData = data
+    return result
@@ -1,6 +1,8 @@
 from Plugins.Plugin import PluginDescriptor
 from Screens.Screen import Screen
 from Screens.MessageBox import MessageBox
+from Screens.ChoiceBox import ChoiceBox
+from Screens.VirtualKeyBoard import VirtualKeyBoard
 from Components.ActionMap import ActionMap
 from Components.ConfigList import ConfigListScreen
 from Components.Label import Label
@@ -9,22 +11,116 @@ from Components.Sources.List import List
 from Components.config import ConfigInteger, ConfigSelection, getConfigListEntry
 from enigma import eTimer, eServiceCenter, eServiceReference, iServiceInformation
 import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom
-import os
-from datetime import datetime
+from .satxml import (SATELLITES_XML_PATH, SATELLITES_XML_PATH_ENIGMA2, POLARIZATION, FEC_INNER, SYSTEM,
+                     MODULATION, PLS_MODE, SatellitesModel, formatSatellite, formatTransponder,
+                     applyTransponderValues, insertTransponder, sortedByFrequency, findDuplicates,
+                     writeSatellitesModel, writeFileAtomic, copyFileAtomic, fileSignature, readSatellitesXml)
+from .snapshot import loadSatellitesCached, saveSnapshot
+from .compact import loadCompact
+from .search import SearchIndex, parseQuery
+from .lamedb import defaultLamedbPath, importTransponders, iterLamedbTransponders
+from .merge import UPSTREAM_XML_PATH, MERGE_BASE_PATH, mergeUpstream, diffSatellites
+from .worker import BackgroundWorker
+from .history import History, InsertOp, DeleteOp, AttribOp, ReorderOp, BatchOp
+from .validate import validateModel, validateSatellite
+from .watcher import FileWatcher, reloadChanged
 
 PLUGIN_VERSION = "1.2"
 PLUGIN_ICON = "icon.png"
 PLUGIN_NAME = "CiefpSatellitesXmlEditor"
 PLUGIN_DESCRIPTION = "Edit satellites.xml file"
-SATELLITES_XML_PATH = "/etc/tuxbox/satellites.xml"
-SATELLITES_XML_PATH_ENIGMA2 = "/etc/enigma2/satellites.xml"
+VISIBLE_ROWS = 24  # 720px Listbox / 30px itemHeight
+READER_TITLE = "..:: Ciefp Satellites.xml Reader ::.."
+
+class CiefpSatelliteXmlBrowser(Screen):
+    """Pregled bez uredjivanja nad kompaktnim modelom; Edit otvara puni reader s istim popisom."""
+    skin = """
+    <screen name="CiefpSatelliteXmlBrowser" position="center,center" size="1800,800" title="..:: Ciefp Satellites.xml Browser ::..">
+        <widget source="list" render="Listbox" position="0,0" size="1400,720" scrollbarMode="showOnDemand" itemHeight="30" font="Regular;24">
+            <convert type="StringList" />
+        </widget>
+        <widget name="background" pixmap="/usr/lib/enigma2/python/Plugins/Extensions/CiefpSatelliteXmlEditor/background.png" position="1400,0" size="400,800" zPosition="-1" />
+        <ePixmap pixmap="/usr/share/enigma2/skin_default/buttons/yellow.png" position="600,750" size="40,40" alphatest="blend" />
+        <widget name="key_yellow" position="650,750" size="150,40" font="Regular;24" halign="left" valign="center" transparent="1" />
+        <widget name="status" position="1100,750" size="300,40" font="Regular;24" halign="left" valign="center" transparent="1" />
+    </screen>"""
+
+    def __init__(self, session):
+        Screen.__init__(self, session)
+        self.session = session
+        self.list = []
+        self["list"] = List(self.list)
+        self["background"] = Pixmap()
+        self["key_yellow"] = Label("Edit")
+        self["status"] = Label("")
+        self["actions"] = ActionMap(["OkCancelActions", "ColorActions"], {
+            "ok": self.okPressed,
+            "cancel": self.close,
+            "yellow": self.edit
+        }, -1)
+        self.compact = None
+        self.expanded = set()
+        self["list"].onSelectionChanged.append(self.formatVisibleRows)
+        self.worker = BackgroundWorker(eTimer)
+        self.onClose.append(self.worker.cancel)
+        self["status"].setText("Loading...")
+        self.worker.start("Loading", lambda progress: loadCompact(SATELLITES_XML_PATH, progress),
+                          self.compactLoaded, self.loadFailed, self.showProgress)
+
+    def compactLoaded(self, result):
+        self.compact = result
+        self["status"].setText("")
+        print(f"[CiefpSatelliteXmlReader] Browsing {self.compact.transponderCount()} transponders on {len(self.compact.sats)} satellites")
+        self.list = [(formatSatellite(sat.attrib), (sat, None)) for sat in self.compact.sats]
+        self["list"].setList(self.list)
+
+    def loadFailed(self, e):
+        self["status"].setText("")
+        print(f"[CiefpSatelliteXmlReader] Error loading satellites.xml: {str(e)}")
+        self.session.open(MessageBox, f"Error loading satellites.xml: {str(e)}", MessageBox.TYPE_ERROR)
+
+    def showProgress(self, percent):
+        self["status"].setText(f"{self.worker.name}... {percent}%")
+
+    def formatRows(self, start, end):
+        # Kao u readeru: redovi transpondera se formatiraju tek kad su blizu vidljivog dijela
+        changed = False
+        for idx in range(max(start, 0), min(end, len(self.list))):
+            text, (sat, row) = self.list[idx]
+            if not text:
+                self.list[idx] = (self.compact.formatRow(sat, row), (sat, row))
+                changed = True
+        return changed
+
+    def formatVisibleRows(self):
+        index = self["list"].getIndex() or 0
+        if self.formatRows(index - VISIBLE_ROWS, index + 2 * VISIBLE_ROWS):
+            self["list"].updateList(self.list)
+
+    def okPressed(self):
+        index = self["list"].getIndex()
+        if self.compact is None or index is None:
+            return
+        sat, row = self.list[index][1]
+        if row is not None:
+            # OK na transponderu zatvara satelit kojem pripada
+            index -= row + 1
+        if sat in self.expanded:
+            self.expanded.discard(sat)
+            del self.list[index + 1:index + 1 + len(sat)]
+        else:
+            self.expanded.add(sat)
+            self.list[index + 1:index + 1] = [("", (sat, row)) for row in range(len(sat))]
+        self.list[index] = (formatSatellite(sat.attrib, sat in self.expanded), (sat, None))
+        self.formatRows(index - VISIBLE_ROWS, index + 2 * VISIBLE_ROWS)
+        self["list"].setList(self.list)
+        self["list"].setIndex(index)
+
+    def edit(self):
+        # Puni model (ElementTree) se gradi tek sada, u readeru
+        if self.compact is not None and not self.worker.running:
+            self.close(self.compact)
 
-POLARIZATION = {"0": "Horizontal", "1": "Vertical", "2": "Left", "3": "Right"}
-FEC_INNER = {"0": "Auto", "1": "1/2", "2": "2/3", "3": "3/4", "4": "5/6", "5": "7/8", "6": "8/9", "7": "3/5", "8": "4/5", "9": "9/10"}
-SYSTEM = {"0": "DVB-S", "1": "DVB-S2", "2": "None"}
-MODULATION = {"0": "Auto", "1": "QPSK", "2": "8PSK", "3": "QAM16", "4": "16APSK", "5": "32APSK", "6": "None"}
-PLS_MODE = {"0": "Root", "1": "Gold", "2": "Auto", "3": "Unknown"}
 
 class CiefpSatelliteXmlReader(Screen):
     skin = """
@@ -41,11 +137,13 @@ class CiefpSatelliteXmlReader(Screen):
         <widget name="key_green" position="400,750" size="150,40" font="Regular;24" halign="left" valign="center" transparent="1" />
         <widget name="key_yellow" position="650,750" size="150,40" font="Regular;24" halign="left" valign="center" transparent="1" />
         <widget name="key_blue" position="900,750" size="150,40" font="Regular;24" halign="left" valign="center" transparent="1" />
+        <widget name="status" position="1100,750" size="300,40" font="Regular;24" halign="left" valign="center" transparent="1" />
     </screen>"""
 
-    def __init__(self, session):
+    def __init__(self, session, compact=None):
         Screen.__init__(self, session)
         self.session = session
+        self.compact = compact  # popis iz preglednika; pretvara se u puni model umjesto citanja datoteke
         self.list = []
         self["list"] = List(self.list)
         self["background"] = Pixmap()
@@ -53,27 +151,169 @@ class CiefpSatelliteXmlReader(Screen):
         self["key_green"] = Label("Save")
         self["key_yellow"] = Label("Edit")
         self["key_blue"] = Label("Add")
-        self["actions"] = ActionMap(["OkCancelActions", "ColorActions"], {
+        self["status"] = Label("")
+        self["actions"] = ActionMap(["OkCancelActions", "ColorActions", "MenuActions", "NumberActions"], {
             "ok": self.okPressed,
-            "cancel": self.close,
+            "cancel": self.cancel,
+            "menu": self.openMenu,
             "red": self.deleteLine,
             "green": self.saveChanges,
             "yellow": self.editLine,
-            "blue": self.addLine
+            "blue": self.addLine,
+            "0": self.toggleSelection
         }, -1)
-        self.tree = None
+        self.model = None
+        self.expanded = set()
+        self.rowCache = {}
+        self.rowIndex = None
+        self.editingSat = None
+        self.editingBefore = None
+        self.history = History()
+        self.selected = set()
+        self.validation = None
+        self.searchIndex = None
+        self.filterQuery = None
+        self.filterResults = None
+        self.savedExpanded = set()
+        self.mergedUpstream = None
+        self["list"].onSelectionChanged.append(self.formatVisibleRows)
         self.focusTimer = eTimer()
         self.focusTimer.callback.append(self.setFocusToCurrent)
+        # Ucitavanje i spremanje rade u pozadinskoj dretvi da GUI ne zastane
+        self.worker = BackgroundWorker(eTimer)
+        self.onClose.append(self.worker.cancel)
+        # Prati izmjene satellites.xml iz drugih programa (npr. FTP, drugi plugin)
+        self.diskSignature = None
+        self.reloadPending = False
+        self.watcher = FileWatcher(SATELLITES_XML_PATH, eTimer, self.checkExternalChange)
+        self.onClose.append(self.watcher.close)
+        self.onExecBegin.append(self.checkPending)
         self.loadXml()
 
     def loadXml(self):
+        self["status"].setText("Loading...")
+        compact = self.compact
+        if compact is not None:
+            job = compact.toModel
+        else:
+            job = lambda progress: loadSatellitesCached(SATELLITES_XML_PATH, progress=progress)
+        self.worker.start("Loading", job, self.xmlLoaded, self.loadFailed, self.showProgress)
+
+    def xmlLoaded(self, result):
+        self.compact = None
+        self.model = result
+        self.rowCache = {}
+        self.history.clear()
+        self.selected = set()
+        self.validation = validateModel(self.model)
+        self["status"].setText(self.validation.summary() if self.validation.issues else "")
+        print(f"[CiefpSatelliteXmlReader] Indexed {self.model.transponderCount()} transponders on {len(self.model.satIndex)} satellites")
+        self.updateList()
+        self.focusTimer.start(100, True)
+        self.diskSignature = self.model.source
+        self.watcher.start()
+
+    def loadFailed(self, e):
+        self["status"].setText("")
+        print(f"[CiefpSatelliteXmlReader] Error loading satellites.xml: {str(e)}")
+        self.session.open(MessageBox, f"Error loading satellites.xml: {str(e)}", MessageBox.TYPE_ERROR)
+
+    def showProgress(self, percent):
+        self["status"].setText(f"{self.worker.name}... {percent}%")
+
+    def isIdle(self):
+        # Dok pozadinski posao radi, model se ne smije mijenjati
+        if self.worker.running:
+            print(f"[CiefpSatelliteXmlReader] {self.worker.name} in progress, action ignored")
+            return False
+        return self.model is not None
+
+    def diskChanged(self):
+        # Datoteka na disku vise nije ona koja je ucitana ili zadnja spremljena
         try:
-            self.tree = ET.parse(SATELLITES_XML_PATH)
-            self.updateList()
-            self.focusTimer.start(100, True)
-        except Exception as e:
-            print(f"[CiefpSatelliteXmlReader] Error loading satellites.xml: {str(e)}")
-            self.session.open(MessageBox, f"Error loading satellites.xml: {str(e)}", MessageBox.TYPE_ERROR)
+            return fileSignature(SATELLITES_XML_PATH) != self.diskSignature
+        except OSError:
+            return True
+
+    def checkPending(self):
+        if self.reloadPending:
+            self.checkExternalChange()
+
+    def checkExternalChange(self):
+        self.reloadPending = False
+        if self.model is None or self.diskSignature is None:
+            return
+        if self.worker.running or self.session.current_dialog is not self:
+            # Vlastito spremanje ili otvoreni dijalog: provjeri kad zavrsi
+            self.reloadPending = True
+            return
+        if not self.diskChanged():
+            return
+        if self.model.source is None:
+            # Spojeni upstream jos nije spremljen; spremanje ce upozoriti prije prepisivanja
+            print(f"[CiefpSatelliteXmlReader] {SATELLITES_XML_PATH} changed by another program, merged list not saved yet")
+            self["status"].setText("satellites.xml changed on disk")
+            return
+        print(f"[CiefpSatelliteXmlReader] {SATELLITES_XML_PATH} changed by another program, reloading changed satellites")
+        self.worker.start("Reloading", lambda progress: readSatellitesXml(SATELLITES_XML_PATH, progress),
+                          self.externalLoaded, self.reloadFailed, self.showProgress)
+
+    def externalLoaded(self, result):
+        self["status"].setText("")
+        if self.session.current_dialog is not self:
+            # Otvoreni dijalog moze drzati stare elemente; ucitaj ponovno kad se zatvori
+            self.reloadPending = True
+            return
+        signature, tree, hashes = result
+        cur = self["list"].getCurrent()
+        current = cur[1] if cur and isinstance(cur[1], ET.Element) else None
+        current_sat = self.model.parents.get(current)
+        current_key = self.model.transKeys.get(current)
+        index = self["list"].getIndex() or 0
+        reload = reloadChanged(self.model, signature, tree, hashes)
+        if reload is None:
+            print(f"[CiefpSatelliteXmlReader] Cannot match {SATELLITES_XML_PATH} blocks, keeping loaded list")
+            self["status"].setText("satellites.xml changed on disk")
+            return
+        self.diskSignature = signature
+        print(f"[CiefpSatelliteXmlReader] External change: {reload.summary()}")
+        if reload.changed():
+            # Zamijenjeni elementi vise ne postoje u modelu; undo koraci bi ih mijenjali
+            self.history.clear()
+            replaced = dict(reload.replaced)
+            for old, new in reload.replaced:
+                if old in self.expanded:
+                    self.expanded.add(new)
+                if old in self.savedExpanded:
+                    self.savedExpanded.add(new)
+                self.forgetElement(self.model.root, old)
+            for old in reload.removed:
+                self.forgetElement(self.model.root, old)
+            self.revalidate(list(replaced.values()) + reload.added)
+            if self.filterResults is not None and self.filterQuery is None:
+                self.clearFilter()
+            else:
+                self.refreshList()
+            # Kursor ostaje na istom satelitu/transponderu, i kad je satelit ponovno ucitan
+            target = replaced.get(current, current)
+            if current_sat in replaced:
+                target = self.model.transIndex[replaced[current_sat]].get(current_key, replaced[current_sat])
+            row = self.findRow(target) if target is not None else -1
+            self["list"].setIndex(row if row != -1 else max(min(index, len(self.list) - 1), 0))
+            self["status"].setText(f"{len(reload.replaced) + len(reload.added) + len(reload.removed)} satellites reloaded")
+        if reload.conflicts:
+            names = ", ".join([sat.get("name", sat.get("position", "")) for sat in reload.conflicts])
+            self.session.open(MessageBox, f"{SATELLITES_XML_PATH} was changed by another program.\n\n{reload.summary()}\n\n"
+                              f"Your unsaved changes were kept for: {names}\n"
+                              "Saving will overwrite the other program's version of these satellites.", MessageBox.TYPE_WARNING)
+        else:
+            self.checkPending()
+
+    def reloadFailed(self, e):
+        # Datoteka je mozda jos u pisanju; sljedeca promjena pokrece novo ucitavanje
+        self["status"].setText("")
+        print(f"[CiefpSatelliteXmlReader] Error reloading satellites.xml: {str(e)}")
+        self.checkPending()
 
     def convertOrbitalPos(self, pos):
         pos = int(pos)
@@ -104,158 +344,640 @@ class CiefpSatelliteXmlReader(Screen):
             "fec_inner": int(frontendData.get("fec_inner", 0)),
             "system": int(frontendData.get("system", 0)),
             "modulation": int(frontendData.get("modulation", 0)),
+            "is_id": max(int(frontendData.get("is_id", 0)), 0),
         }
         print(f"[CiefpSatelliteXmlReader] Current transponder data: {data}")
         return data
 
+    def findRow(self, elem):
+        # Mapa element -> red se gradi tek kad zatreba i ponistava pri promjeni strukture liste
+        if self.rowIndex is None:
+            self.rowIndex = {row[1]: idx for idx, row in enumerate(self.list)}
+        return self.rowIndex.get(elem, -1)
+
     def setFocusToCurrent(self):
         current_data = self.getCurrentTransponderData()
         if not current_data:
             print("[CiefpSatelliteXmlReader] No current transponder data, keeping focus on first row")
             return
         
-        found_index = -1
-        current_sat = None
-        for idx, (text, elem) in enumerate(self.list):
-            if elem.tag == "sat":
-                sat_pos = int(elem.get("position", "0"))
-                print(f"[CiefpSatelliteXmlReader] Checking satellite: {elem.get('name')} (position={sat_pos})")
-                if sat_pos == current_data["orbital_position"]:
-                    current_sat = elem
-                    found_index = idx
-                    print(f"[CiefpSatelliteXmlReader] Satellite match found at index {idx}: {text}")
-            elif elem.tag == "transponder" and current_sat:
-                trans_freq = int(elem.get("frequency", "0")) // 1000
-                trans_sr = int(elem.get("symbol_rate", "0")) // 1000
-                trans_pol = int(elem.get("polarization", "0"))
-                trans_fec = int(elem.get("fec_inner", "0"))
-                trans_sys = int(elem.get("system", "0"))
-                trans_mod = int(elem.get("modulation", "0"))
-                print(f"[CiefpSatelliteXmlReader] Checking transponder: {trans_freq} MHz, {trans_sr} kS/s, pol={trans_pol}, fec={trans_fec}, sys={trans_sys}, mod={trans_mod}")
-                
-                if (trans_freq == current_data["frequency"] and
-                    trans_sr == current_data["symbol_rate"] and
-                    trans_pol == current_data["polarization"] and
-                    trans_fec == current_data["fec_inner"] and
-                    trans_sys == current_data["system"] and
-                    trans_mod == current_data["modulation"]):
-                    found_index = idx
-                    print(f"[CiefpSatelliteXmlReader] Transponder match found at index {idx}: {text}")
-                    break
-        
-        if found_index != -1 and found_index < len(self.list):
-            print(f"[CiefpSatelliteXmlReader] Setting focus to index {found_index}")
-            self["list"].setList(self.list)
-            self["list"].setIndex(found_index)
-        else:
+        sat = self.model.findSatellite(current_data["orbital_position"])
+        sat_index = self.findRow(sat) if sat is not None else -1
+        if sat_index == -1:
             print("[CiefpSatelliteXmlReader] No match found or invalid index, keeping focus on first row")
+            return
+        print(f"[CiefpSatelliteXmlReader] Satellite match found at index {sat_index}: {sat.get('name')}")
+        
+        # Razvij samo satelit koji odgovara tuneru
+        if sat not in self.expanded:
+            self.toggleSatellite(sat_index)
+        
+        found_index = sat_index
+        trans = self.model.findTransponder(sat, current_data)
+        if trans is not None:
+            found_index = max(self.findRow(trans), sat_index)
+            print(f"[CiefpSatelliteXmlReader] Transponder match found at index {found_index}: {self.model.transKeys[trans]}")
+        
+        print(f"[CiefpSatelliteXmlReader] Setting focus to index {found_index}")
+        self.formatRows(found_index - VISIBLE_ROWS, found_index + 2 * VISIBLE_ROWS)
+        self["list"].setList(self.list)
+        self["list"].setIndex(found_index)
+
+    def formatTransponder(self, trans):
+        display_text = self.rowCache.get(trans)
+        if display_text is None:
+            display_text = self.rowCache[trans] = formatTransponder(trans)
+        return display_text
+
+    def rowText(self, trans):
+        # Oznake odabira i gresaka se ne spremaju u rowCache
+        text = self.formatTransponder(trans)
+        if self.validation is not None:
+            text += self.validation.text(trans)
+        if trans in self.selected:
+            return f"* {text}"
+        return text
+
+    def formatRows(self, start, end):
+        # Formatiraj samo redove oko vidljivog dijela liste
+        changed = False
+        for idx in range(max(start, 0), min(end, len(self.list))):
+            text, elem = self.list[idx]
+            if not text:
+                self.list[idx] = (self.rowText(elem), elem)
+                changed = True
+        return changed
+
+    def formatVisibleRows(self):
+        index = self["list"].getIndex() or 0
+        if self.formatRows(index - VISIBLE_ROWS, index + 2 * VISIBLE_ROWS):
+            self["list"].updateList(self.list)
 
     def updateList(self):
         self.list = []
-        root = self.tree.getroot()
-        for sat in root.findall("sat"):
-            sat_name = sat.get("name")
-            sat_pos = sat.get("position")
-            self.list.append((f"Satellite: {sat_name} ({sat_pos})", sat))
-            for trans in sat.findall("transponder"):
-                freq = int(trans.get("frequency", "0")) // 1000
-                sr = int(trans.get("symbol_rate", "0")) // 1000
-                pol = POLARIZATION.get(trans.get("polarization", "0"), "Unknown")
-                fec = FEC_INNER.get(trans.get("fec_inner", "0"), "Unknown")
-                sys = SYSTEM.get(trans.get("system", "0"), "Unknown")
-                mod = MODULATION.get(trans.get("modulation", "0"), "Unknown")
-                
-                extra = []
-                is_id = trans.get("is_id")
-                pls_mode = trans.get("pls_mode")
-                pls_code = trans.get("pls_code")
-                t2mi_plp_id = trans.get("t2mi_plp_id")
-                t2mi_pid = trans.get("t2mi_pid")
-                
-                if is_id and int(is_id) > 0:
-                    extra.append(f"MIS: is_id={is_id}, pls_mode={PLS_MODE.get(pls_mode, 'Unknown')}, pls_code={pls_code}")
-                if t2mi_plp_id and int(t2mi_plp_id) >= 0:
-                    extra.append(f"T2-MI: plp_id={t2mi_plp_id}, pid={t2mi_pid or '0'}")
-                
-                display_text = f"  TR: {freq} {pol} {sr} {fec} {sys} {mod}"
-                if extra:
-                    display_text += f" [{' | '.join(extra)}]"
-                
-                self.list.append((display_text, trans))
+        for sat in self.model.satellites():
+            if self.filterResults is not None and sat not in self.filterResults:
+                continue
+            self.list.append((formatSatellite(sat, sat in self.expanded), sat))
+            if sat in self.expanded:
+                self.list.extend([("", trans) for trans in self.visibleTransponders(sat)])
+        self.rowIndex = None
+        self.formatRows(0, 2 * VISIBLE_ROWS)
         self["list"].setList(self.list)
         print(f"[CiefpSatelliteXmlReader] List populated with {len(self.list)} items")
 
+    def rowsEnd(self, index):
+        # Prvi red iza satelita na index i njegovih prikazanih transpondera
+        end = index + 1
+        while end < len(self.list) and self.list[end][1].tag == "transponder":
+            end += 1
+        return end
+
+    def toggleSatellite(self, index):
+        sat = self.list[index][1]
+        if sat in self.expanded:
+            self.expanded.discard(sat)
+            del self.list[index + 1:self.rowsEnd(index)]
+        else:
+            self.expanded.add(sat)
+            self.list[index + 1:index + 1] = [("", trans) for trans in self.visibleTransponders(sat)]
+        self.rowIndex = None
+        self.list[index] = (formatSatellite(sat, sat in self.expanded), sat)
+        self.formatRows(index - VISIBLE_ROWS, index + 2 * VISIBLE_ROWS)
+        self["list"].setList(self.list)
+        self["list"].setIndex(index)
+
+    def visibleTransponders(self, sat):
+        if self.filterResults is not None:
+            return self.filterResults.get(sat, [])
+        return sat.findall("transponder")
+
+    def cancel(self):
+        if self.worker.running and self.worker.name == "Saving":
+            return
+        if self.filterResults is not None:
+            self.clearFilter()
+        else:
+            self.close()
+
+    def openMenu(self):
+        if not self.isIdle():
+            return
+        menu = [("Search / filter", self.openSearch), ("Import from lamedb", self.importLamedb),
+                (f"Merge upstream {UPSTREAM_XML_PATH}", self.mergeUpstream)]
+        if self.history.undoLabel():
+            menu.append((f"Undo {self.history.undoLabel()}", self.undo))
+        if self.history.redoLabel():
+            menu.append((f"Redo {self.history.redoLabel()}", self.redo))
+        if self.filterResults is not None:
+            menu.append(("Clear filter", self.clearFilter))
+        if self.validation is not None and self.validation.issues:
+            menu.append((f"Show validation issues ({len(self.validation.issues)})", self.showIssues))
+        if self.selected:
+            count = len(self.selected)
+            menu.extend([(f"Delete selected ({count})", self.deleteSelected),
+                         (f"Set polarization of selected ({count})", lambda: self.chooseValue("polarization", POLARIZATION)),
+                         (f"Set system of selected ({count})", lambda: self.chooseValue("system", SYSTEM)),
+                         (f"Set modulation of selected ({count})", lambda: self.chooseValue("modulation", MODULATION)),
+                         ("Clear selection", self.clearSelection)])
+        sat = self.currentSatellite()
+        if sat is not None:
+            menu.extend([(f"Sort {sat.get('name', '')} by frequency", lambda: self.sortSatellites([sat])),
+                         (f"Remove duplicates in {sat.get('name', '')}", lambda: self.removeDuplicates([sat]))])
+        menu.extend([("Sort all satellites by frequency", lambda: self.sortSatellites(self.model.satellites())),
+                     ("Remove duplicates in all satellites", lambda: self.removeDuplicates(self.model.satellites()))])
+        self.session.openWithCallback(self.menuCallback, ChoiceBox, title="Satellites.xml Reader", list=menu)
+
+    def menuCallback(self, choice):
+        if choice:
+            choice[1]()
+
+    def openSearch(self):
+        self.session.openWithCallback(self.searchEntered, VirtualKeyBoard,
+                                      title="Search (f:10700-11700 pol:v s2 mod:8psk sr:20000- mis t2mi sat:19.2E)",
+                                      text=self.filterQuery or "")
+
+    def searchEntered(self, text):
+        if text is None:
+            return
+        if not text.strip():
+            self.clearFilter()
+        else:
+            self.applyFilter(text.strip())
+
+    def applyFilter(self, text):
+        try:
+            query = parseQuery(text)
+        except ValueError as e:
+            self.session.open(MessageBox, str(e), MessageBox.TYPE_ERROR)
+            return
+        if self.searchIndex is None:
+            self.searchIndex = SearchIndex(self.model)
+        results = self.searchIndex.search(query)
+        if not results:
+            self.session.open(MessageBox, f"No transponders match: {text}", MessageBox.TYPE_INFO)
+            return
+        count = sum(len(matches) for sat, matches in results)
+        print(f"[CiefpSatelliteXmlReader] Filter '{text}': {count} transponders on {len(results)} satellites")
+        self.showFiltered(results, text, f"Filter: {text} ({count} transponders)")
+
+    def showFiltered(self, results, query, title):
+        if self.filterResults is None:
+            self.savedExpanded = self.expanded
+        self.filterQuery = query
+        self.filterResults = dict(results)
+        self.expanded = set(self.filterResults)
+        self.setTitle(title)
+        self.updateList()
+        self["list"].setIndex(0)
+
+    def clearFilter(self):
+        if self.filterResults is None:
+            return
+        self.expanded = {sat for sat in self.savedExpanded if sat in self.model.transIndex}
+        self.filterResults = None
+        self.setTitle(READER_TITLE)
+        self.updateList()
+
+    def importLamedb(self):
+        if not self.isIdle():
+            return
+        path = defaultLamedbPath()
+        self["status"].setText("Importing...")
+        # Citanje lamedb u pozadini; umetanje u model na GUI dretvi
+        self.worker.start("Importing", lambda progress: list(iterLamedbTransponders(path)),
+                          lambda records: self.lamedbRead(path, records),
+                          lambda e: self.actionFailed(f"Error importing {path}", e))
+
+    def lamedbRead(self, path, records):
+        self["status"].setText("")
+        result = importTransponders(self.model, records)
+        print(f"[CiefpSatelliteXmlReader] Imported {path}: {len(result.added)} added, {result.skipped} skipped, {len(result.conflicts)} conflicting")
+        if result.added:
+            # Jedan undo korak za cijeli uvoz; indeksi rastuce po satelitu da redo vrati isti redoslijed
+            ops = []
+            added = set(result.added)
+            for sat in {self.model.parents[trans]: None for trans in result.added}:
+                ops.extend([InsertOp(sat, i, trans) for i, trans in enumerate(sat) if trans in added])
+            self.history.record(BatchOp(f"lamedb import ({len(ops)})", ops))
+            self.revalidate({op.parent for op in ops})
+            self.refreshList()
+        self.session.open(MessageBox, f"Import from {path}\n\n{result.summary()}", MessageBox.TYPE_INFO)
+
+    def actionFailed(self, message, e):
+        self["status"].setText("")
+        print(f"[CiefpSatelliteXmlReader] {message}: {str(e)}")
+        self.session.open(MessageBox, f"{message}: {str(e)}", MessageBox.TYPE_ERROR)
+
+    def mergeUpstream(self):
+        if not self.isIdle():
+            return
+        self["status"].setText("Merging...")
+        local_root = self.model.root
+        self.worker.start("Merging", lambda progress: self.mergeFiles(local_root),
+                          self.upstreamMerged, lambda e: self.actionFailed(f"Error merging {UPSTREAM_XML_PATH}", e))
+
+    def mergeFiles(self, local_root):
+        # Izvrsava se u pozadinskoj dretvi; lokalni model se samo cita, novi model se gradi zasebno
+        result = mergeUpstream(local_root, UPSTREAM_XML_PATH, MERGE_BASE_PATH)
+        changes = diffSatellites(local_root, result.root)
+        model = SatellitesModel(ET.ElementTree(result.root))
+        return result, changes, model, validateModel(model)
+
+    def upstreamMerged(self, merged):
+        self["status"].setText("")
+        result, changes, self.model, self.validation = merged
+        self.rowCache = {}
+        self.searchIndex = None
+        self.filterResults = None
+        self.expanded = set()
+        self.savedExpanded = set()
+        self.mergedUpstream = result.upstreamData
+        self.history.clear()
+        self.selected = set()
+        print(f"[CiefpSatelliteXmlReader] Merged {UPSTREAM_XML_PATH}: {len(changes)} changes, {len(result.conflicts)} conflicts")
+        if result.conflicts:
+            # Prikazi samo konfliktne retke; Exit vraca cijeli spojeni popis
+            conflicts = {}
+            for position, key, reason, elem in result.conflicts:
+                sat = self.model.parents.get(elem) if elem is not None else self.model.findSatellite(int(position))
+                if sat is not None:
+                    conflicts.setdefault(sat, [])
+                    if elem is not None:
+                        conflicts[sat].append(elem)
+            results = [(sat, conflicts[sat]) for sat in self.model.satellites() if sat in conflicts]
+            self.showFiltered(results, None, f"Merge conflicts ({len(result.conflicts)})")
+        else:
+            self.setTitle(READER_TITLE)
+            self.updateList()
+        added = sum(1 for change in changes if change[1] == "added")
+        removed = sum(1 for change in changes if change[1] == "removed")
+        summary = f"Changes against current list: +{added} -{removed} ~{len(changes) - added - removed}\n{result.summary()}"
+        self.session.open(MessageBox, f"Merged {UPSTREAM_XML_PATH} (not saved yet)\n\n{summary}", MessageBox.TYPE_INFO)
+
+    def refreshList(self):
+        self.searchIndex = None
+        if self.filterResults is not None and self.filterQuery is not None:
+            self.applyFilter(self.filterQuery)
+            return
+        index = self["list"].getIndex()
+        self.updateList()
+        self["list"].setIndex(min(index, len(self.list) - 1))
+
     def okPressed(self):
-        self.editLine()
+        cur = self["list"].getCurrent()
+        if cur and isinstance(cur[1], ET.Element) and cur[1].tag == "sat":
+            self.toggleSatellite(self["list"].getIndex())
+        else:
+            self.editLine()
 
     def deleteLine(self):
+        if not self.isIdle():
+            return
         cur = self["list"].getCurrent()
         if cur and isinstance(cur[1], ET.Element):
-            root = self.tree.getroot()
-            if cur[1].tag == "sat":
-                root.remove(cur[1])
-            elif cur[1].tag == "transponder":
-                for sat in root.findall("sat"):
-                    for trans in sat.findall("transponder"):
-                        if trans == cur[1]:
-                            sat.remove(trans)
-                            break
-                    else:
-                        continue
-                    break
-            self.updateList()
+            elem = cur[1]
+            parent = self.model.root if elem.tag == "sat" else self.model.parents.get(elem)
+            if parent is None:
+                return
+            op = DeleteOp(parent, list(parent).index(elem), elem)
+            self.history.record(op)
+            self.applyEffects(op.apply(self.model))
+
+    def currentSatellite(self):
+        cur = self["list"].getCurrent()
+        if not cur or not isinstance(cur[1], ET.Element):
+            return None
+        return cur[1] if cur[1].tag == "sat" else self.model.parents.get(cur[1])
+
+    def toggleSelection(self):
+        # 0: odaberi transponder i idi na sljedeci red; na satelitu odaberi sve njegove prikazane transpondere
+        if not self.isIdle():
+            return
+        cur = self["list"].getCurrent()
+        if not cur or not isinstance(cur[1], ET.Element):
+            return
+        index = self["list"].getIndex()
+        if cur[1].tag == "sat":
+            transponders = self.visibleTransponders(cur[1])
+            if all(trans in self.selected for trans in transponders):
+                self.selected.difference_update(transponders)
+            else:
+                self.selected.update(transponders)
+            rows = range(index + 1, self.rowsEnd(index)) if cur[1] in self.expanded else ()
+        else:
+            self.selected.symmetric_difference_update([cur[1]])
+            rows = (index,)
+        for row in rows:
+            self.list[row] = (self.rowText(self.list[row][1]), self.list[row][1])
+            self["list"].modifyEntry(row, self.list[row])
+        self["status"].setText(f"{len(self.selected)} selected" if self.selected else "")
+        if cur[1].tag == "transponder" and index + 1 < len(self.list):
+            self["list"].setIndex(index + 1)
+
+    def clearSelection(self):
+        self.selected = set()
+        self["status"].setText("")
+        self.refreshList()
+
+    def recordBatch(self, name, ops):
+        # Jedan undo korak i jedno osvjezavanje liste za cijelu grupnu akciju
+        if not ops:
+            return
+        op = BatchOp(name, ops)
+        self.history.record(op)
+        self.applyEffects(op.apply(self.model))
+
+    def deleteOps(self, transponders):
+        # Unutar satelita od najveceg indeksa, da undo (obrnutim redom) vraca na iste pozicije
+        positions = {}
+        ops = []
+        for trans in transponders:
+            sat = self.model.parents.get(trans)
+            if sat is None:
+                continue
+            if sat not in positions:
+                positions[sat] = {elem: i for i, elem in enumerate(sat)}
+            ops.append(DeleteOp(sat, positions[sat][trans], trans))
+        ops.sort(key=lambda op: (id(op.parent), -op.index))
+        return ops
+
+    def deleteSelected(self):
+        ops = self.deleteOps(self.selected)
+        self.recordBatch(f"delete {len(ops)} transponders", ops)
+        self.selected = set()
+        self["status"].setText("")
+
+    def chooseValue(self, attr, choices):
+        self.session.openWithCallback(lambda choice: self.setSelected(attr, choice), ChoiceBox,
+                                      title=f"Set {attr} of {len(self.selected)} transponders",
+                                      list=[(name, value) for value, name in choices.items()])
+
+    def setSelected(self, attr, choice):
+        if not choice:
+            return
+        ops = [AttribOp(trans, {attr: trans.get(attr)}, {attr: choice[1]})
+               for trans in self.selected if trans in self.model.parents and trans.get(attr) != choice[1]]
+        self.recordBatch(f"set {attr} of {len(ops)} transponders", ops)
+
+    def sortSatellites(self, sats):
+        ops = []
+        for sat in sats:
+            before = sat.findall("transponder")
+            after = sortedByFrequency(sat)
+            if after != before:
+                ops.append(ReorderOp(sat, before, after))
+        self.recordBatch(f"sort {len(ops)} satellites", ops)
+        if not ops:
+            self.session.open(MessageBox, "Already sorted by frequency.", MessageBox.TYPE_INFO)
+
+    def removeDuplicates(self, sats):
+        duplicates = []
+        for sat in sats:
+            duplicates.extend(findDuplicates(self.model, sat))
+        self.recordBatch(f"remove {len(duplicates)} duplicates", self.deleteOps(duplicates))
+        self.session.open(MessageBox, f"Removed {len(duplicates)} duplicate transponders." if duplicates
+                          else "No duplicate transponders found.", MessageBox.TYPE_INFO)
+
+    def forgetElement(self, parent, elem):
+        # Obrisani element vise nije razvijen, odabran, provjeren ni u rezultatima filtera
+        self.expanded.discard(elem)
+        self.selected.discard(elem)
+        self.rowCache.pop(elem, None)
+        self.validation.issues.pop(elem, None)
+        if elem.tag == "sat":
+            self.selected.difference_update(elem)
+            self.validation.clearSatellite(elem)
+            for trans in elem:
+                self.rowCache.pop(trans, None)
+        if self.filterResults is not None:
+            self.filterResults.pop(elem, None)
+            if elem in self.filterResults.get(parent, []):
+                self.filterResults[parent].remove(elem)
+
+    def revalidate(self, sats):
+        for sat in sats:
+            if sat is not None and sat in self.model.transIndex:
+                self.validation.clearSatellite(sat)
+                validateSatellite(self.model, sat, self.validation)
+
+    def showIssues(self):
+        issues = self.validation.issues
+        results = []
+        for sat in self.model.satellites():
+            transponders = [trans for trans in sat.findall("transponder") if trans in issues]
+            if transponders:
+                results.append((sat, transponders))
+        self.showFiltered(results, None, f"Validation: {self.validation.summary()}")
+
+    def undo(self):
+        if self.isIdle():
+            self.applyEffects(self.history.undo(self.model))
+
+    def redo(self):
+        if self.isIdle():
+            self.applyEffects(self.history.redo(self.model))
+
+    def applyEffects(self, effects):
+        # Azuriraj samo redove koje je operacija dotakla
+        if not effects:
+            return
+        self.searchIndex = None
+        sats = set()
+        for change, parent, elem in effects:
+            if change == "remove":
+                self.forgetElement(parent, elem)
+            elif change == "update":
+                self.rowCache.pop(elem, None)
+            sats.add(elem if parent is self.model.root else parent or self.model.parents.get(elem))
+        self.revalidate(sats)
+        if len(effects) > VISIBLE_ROWS:
+            self.refreshList()
+            return
+        index = self["list"].getIndex()
+        structure_changed = False
+        for change, parent, elem in effects:
+            if change == "update":
+                row = self.findRow(elem)
+                if row != -1:
+                    self.list[row] = (self.rowText(elem), elem)
+                    self["list"].modifyEntry(row, self.list[row])
+                    index = row
+            elif change == "remove":
+                row = self.findRow(elem)
+                if row != -1:
+                    del self.list[row:self.rowsEnd(row) if elem.tag == "sat" else row + 1]
+                    self.rowIndex = None
+                    index = row
+                    structure_changed = True
+            elif self.filterResults is not None:
+                # Umetanje ili sortiranje u filtriranom prikazu: filter se ponovno primjenjuje
+                self.refreshList()
+                return
+            elif change == "reorder":
+                row = self.findRow(parent)
+                if parent in self.expanded and row != -1:
+                    self.list[row + 1:self.rowsEnd(row)] = [("", trans) for trans in self.visibleTransponders(parent)]
+                    self.rowIndex = None
+                    index = row
+                    structure_changed = True
+            elif parent is self.model.root:
+                # Vraceni satelit ide ispred sljedeceg prikazanog satelita
+                row = len(self.list)
+                siblings = list(parent)
+                for sibling in siblings[siblings.index(elem) + 1:]:
+                    if self.findRow(sibling) != -1:
+                        row = self.findRow(sibling)
+                        break
+                self.list.insert(row, (formatSatellite(elem), elem))
+                self.rowIndex = None
+                index = row
+                structure_changed = True
+            else:
+                sat_row = self.findRow(parent)
+                if parent in self.expanded and sat_row != -1:
+                    row = sat_row + 1 + list(parent).index(elem)
+                    self.list.insert(row, ("", elem))
+                    self.rowIndex = None
+                    index = row
+                    structure_changed = True
+        for sat in sats:
+            # Provjera je mogla promijeniti oznake i na drugim redovima istog satelita
+            row = self.findRow(sat)
+            if sat in self.expanded and row != -1:
+                for idx in range(row + 1, self.rowsEnd(row)):
+                    self.list[idx] = ("", self.list[idx][1])
+                structure_changed = True
+        index = max(min(index, len(self.list) - 1), 0)
+        if structure_changed:
+            self.formatRows(index - VISIBLE_ROWS, index + 2 * VISIBLE_ROWS)
+            self["list"].setList(self.list)
+            self["list"].setIndex(index)
+        elif index != self["list"].getIndex():
+            self["list"].setIndex(index)
 
     def saveChanges(self):
-        try:
-            rough_string = ET.tostring(self.tree.getroot(), encoding='iso-8859-1')
-            parsed = minidom.parseString(rough_string)
-            pretty_xml = parsed.toprettyxml(indent="\t", encoding='iso-8859-1').decode('iso-8859-1')
-            
-            lines = pretty_xml.split('\n')
-            filtered_lines = []
-            for line in lines:
-                stripped = line.strip()
-                if stripped and not stripped.startswith('<?xml') and not stripped.startswith('<!'):
-                    filtered_lines.append(line.rstrip())
-                elif stripped.startswith('<?xml') or stripped.startswith('<!'):
-                    filtered_lines.append(line)
-            
-            current_date = datetime.now().strftime("%d.%m.%Y")
-            header = f"""<?xml version="1.0" encoding="iso-8859-1"?>
-<!--
-\tFile edited by ciefp satellite.xml editor, {current_date}
--->
-"""
-            final_xml = header + '\n'.join(filtered_lines[1:])
-            
-            # Spremi na /etc/tuxbox/satellites.xml
-            with open(SATELLITES_XML_PATH, 'w', encoding='iso-8859-1') as f:
-                f.write(final_xml)
-            print(f"[CiefpSatelliteXmlReader] Saved to {SATELLITES_XML_PATH}")
-            
-            # Spremi na /etc/enigma2/satellites.xml
+        if not self.isIdle():
+            return
+        if not self.model.isModified():
+            self.session.open(MessageBox, "No changes to save.", MessageBox.TYPE_INFO)
+            return
+        if self.diskChanged():
+            self.session.openWithCallback(self.confirmOverwrite, MessageBox,
+                                          f"{SATELLITES_XML_PATH} was changed by another program since it was loaded.\n\n"
+                                          "Overwrite it with your list? Choose No to reload the changed satellites first.",
+                                          MessageBox.TYPE_YESNO, default=False)
+            return
+        self.validateAndSave()
+
+    def confirmOverwrite(self, answer):
+        if answer:
+            self.validateAndSave()
+        else:
+            self.checkExternalChange()
+
+    def validateAndSave(self):
+        # Puna provjera u jednom prolazu prije zapisa
+        self.validation = validateModel(self.model)
+        errors, warnings = self.validation.counts()
+        if errors:
+            self.refreshList()
+            self.session.openWithCallback(self.confirmSave, MessageBox,
+                                          f"{self.validation.summary()}.\nUse Menu > Show validation issues to review.\n\nSave anyway?",
+                                          MessageBox.TYPE_YESNO, default=False)
+            return
+        self.startSave()
+
+    def confirmSave(self, answer):
+        if answer:
+            self.startSave()
+
+    def startSave(self):
+        self["status"].setText("Saving...")
+        merged_upstream = self.mergedUpstream
+        self.worker.start("Saving", lambda progress: self.writeFiles(merged_upstream, progress),
+                          self.changesSaved, self.saveFailed, self.showProgress)
+
+    def writeFiles(self, merged_upstream, progress):
+        # Izvrsava se u pozadinskoj dretvi; vraca gresku druge lokacije ili None
+        # Spremi na /etc/tuxbox/satellites.xml
+        dirty = len(self.model.dirty)
+        reused = writeSatellitesModel(self.model, SATELLITES_XML_PATH, progress)
+        print(f"[CiefpSatelliteXmlReader] Saved to {SATELLITES_XML_PATH} ({dirty} modified, {reused} satellites copied unchanged)")
+        saveSnapshot(self.model, SATELLITES_XML_PATH)
+        if merged_upstream:
+            # Spojeni upstream (procitan pri mergeu) postaje baza za sljedeci merge
             try:
-                with open(SATELLITES_XML_PATH_ENIGMA2, 'w', encoding='iso-8859-1') as f:
-                    f.write(final_xml)
-                print(f"[CiefpSatelliteXmlReader] Saved to {SATELLITES_XML_PATH_ENIGMA2}")
+                writeFileAtomic(merged_upstream, MERGE_BASE_PATH)
             except Exception as e:
-                print(f"[CiefpSatelliteXmlReader] Error saving to {SATELLITES_XML_PATH_ENIGMA2}: {str(e)}")
-                self.session.open(MessageBox, f"Error saving to {SATELLITES_XML_PATH_ENIGMA2}: {str(e)}", MessageBox.TYPE_ERROR)
-            
-            self.session.open(MessageBox, "Changes saved successfully to both locations!", MessageBox.TYPE_INFO)
+                # Glavna datoteka je vec spremljena; bez baze sljedeci merge je samo unija
+                print(f"[CiefpSatelliteXmlReader] Error saving merge base {MERGE_BASE_PATH}: {str(e)}")
+
+        # Kopiraj vec zapisanu datoteku na /etc/enigma2/satellites.xml
+        try:
+            if copyFileAtomic(SATELLITES_XML_PATH, SATELLITES_XML_PATH_ENIGMA2):
+                print(f"[CiefpSatelliteXmlReader] Saved to {SATELLITES_XML_PATH_ENIGMA2}")
+            else:
+                print(f"[CiefpSatelliteXmlReader] {SATELLITES_XML_PATH_ENIGMA2} already up to date")
         except Exception as e:
-            print(f"[CiefpSatelliteXmlReader] Error saving satellites.xml: {str(e)}")
-            self.session.open(MessageBox, f"Error saving satellites.xml: {str(e)}", MessageBox.TYPE_ERROR)
+            print(f"[CiefpSatelliteXmlReader] Error saving to {SATELLITES_XML_PATH_ENIGMA2}: {str(e)}")
+            return f"Error saving to {SATELLITES_XML_PATH_ENIGMA2}: {str(e)}"
+        return None
+
+    def changesSaved(self, error):
+        self["status"].setText("")
+        self.mergedUpstream = None
+        self.diskSignature = self.model.source
+        if error:
+            self.session.open(MessageBox, error, MessageBox.TYPE_ERROR)
+        else:
+            self.session.open(MessageBox, "Changes saved successfully to both locations!", MessageBox.TYPE_INFO)
+
+    def saveFailed(self, e):
+        self["status"].setText("")
+        if self.model.source is not None:
+            self.diskSignature = self.model.source
+        print(f"[CiefpSatelliteXmlReader] Error saving satellites.xml: {str(e)}")
+        self.session.open(MessageBox, f"Error saving satellites.xml: {str(e)}", MessageBox.TYPE_ERROR)
 
     def editLine(self):
+        if not self.isIdle():
+            return
         cur = self["list"].getCurrent()
         if cur and isinstance(cur[1], ET.Element) and cur[1].tag == "transponder":
-            self.session.open(CiefpSatelliteXmlEditor, cur[1], False)
+            self.editingSat = self.model.parents[cur[1]]
+            self.editingBefore = dict(cur[1].attrib)
+            self.session.openWithCallback(self.editorClosed, CiefpSatelliteXmlEditor, cur[1], False)
 
     def addLine(self):
+        if not self.isIdle():
+            return
         cur = self["list"].getCurrent()
         if cur and isinstance(cur[1], ET.Element) and cur[1].tag == "sat":
-            self.session.open(CiefpSatelliteXmlEditor, cur[1], True)
+            self.editingSat = cur[1]
+            self.session.openWithCallback(self.editorClosed, CiefpSatelliteXmlEditor, cur[1], True)
+
+    def editorClosed(self, element=None):
+        sat = self.editingSat
+        before = self.editingBefore
+        self.editingSat = None
+        self.editingBefore = None
+        if element is None or sat is None:
+            return
+        if element in self.model.parents:
+            # Izmjena: editor je vec promijenio atribute, ponovno formatiraj samo taj red
+            op = AttribOp(element, before or {}, dict(element.attrib))
+            if not op.changes:
+                # Spremljeno bez izmjena: satelit ostaje cist, spremanje nema sto pisati
+                return
+            self.history.record(op)
+            self.model.updateTransponder(element)
+        else:
+            # Novi transponder: editor ga je vec umetnuo u stablo po frekvenciji
+            self.history.record(InsertOp(sat, list(sat).index(element), element))
+            self.model.indexTransponder(sat, element)
+            self.model.markDirty(sat)
+        self.applyEffects([("update" if before is not None else "insert", sat, element)])
 
 class CiefpSatelliteXmlEditor(ConfigListScreen, Screen):
     skin = """
@@ -331,72 +1053,54 @@ class CiefpSatelliteXmlEditor(ConfigListScreen, Screen):
     def edit(self):
         self.keyRight()
 
+    def getValues(self):
+        return {
+            "frequency": str(self.frequency.value * 1000),
+            "symbol_rate": str(self.symbol_rate.value * 1000),
+            "polarization": self.polarization.value,
+            "fec_inner": self.fec_inner.value,
+            "system": self.system.value,
+            "modulation": self.modulation.value,
+            "is_id": str(self.is_id.value),
+            "pls_code": str(self.pls_code.value),
+            "pls_mode": self.pls_mode.value,
+            "t2mi_plp_id": str(self.t2mi_plp_id.value),
+            "t2mi_pid": str(self.t2mi_pid.value),
+        }
+
     def save(self):
         if self.is_new:
-            new_trans = ET.Element("transponder")
-            new_trans.set("frequency", str(self.frequency.value * 1000))
-            new_trans.set("symbol_rate", str(self.symbol_rate.value * 1000))
-            new_trans.set("polarization", self.polarization.value)
-            new_trans.set("fec_inner", self.fec_inner.value)
-            new_trans.set("system", self.system.value)
-            new_trans.set("modulation", self.modulation.value)
-            
-            if self.is_id.value > 0:
-                new_trans.set("is_id", str(self.is_id.value))
-                new_trans.set("pls_code", str(self.pls_code.value))
-                new_trans.set("pls_mode", self.pls_mode.value)
-            
-            if self.t2mi_plp_id.value >= 0:
-                new_trans.set("t2mi_plp_id", str(self.t2mi_plp_id.value))
-                new_trans.set("t2mi_pid", str(self.t2mi_pid.value))
-            
-            # Pronađi ispravnu poziciju za umetanje prema frekvenciji
-            transponders = self.element.findall("transponder")
-            insert_index = 0
-            new_freq = int(new_trans.get("frequency"))
-            for i, trans in enumerate(transponders):
-                trans_freq = int(trans.get("frequency", "0"))
-                if new_freq < trans_freq:
-                    break
-                insert_index = i + 1
-            
-            self.element.insert(insert_index, new_trans)
+            new_trans = applyTransponderValues(ET.Element("transponder"), self.getValues())
+            insertTransponder(self.element, new_trans)
             self.element = new_trans
         else:
-            self.element.set("frequency", str(self.frequency.value * 1000))
-            self.element.set("symbol_rate", str(self.symbol_rate.value * 1000))
-            self.element.set("polarization", self.polarization.value)
-            self.element.set("fec_inner", self.fec_inner.value)
-            self.element.set("system", self.system.value)
-            self.element.set("modulation", self.modulation.value)
-            
-            if self.is_id.value > 0:
-                self.element.set("is_id", str(self.is_id.value))
-                self.element.set("pls_code", str(self.pls_code.value))
-                self.element.set("pls_mode", self.pls_mode.value)
-            else:
-                for attr in ["is_id", "pls_code", "pls_mode"]:
-                    if attr in self.element.attrib:
-                        del self.element.attrib[attr]
-            
-            if self.t2mi_plp_id.value >= 0:
-                self.element.set("t2mi_plp_id", str(self.t2mi_plp_id.value))
-                self.element.set("t2mi_pid", str(self.t2mi_pid.value))
-            else:
-                for attr in ["t2mi_plp_id", "t2mi_pid"]:
-                    if attr in self.element.attrib:
-                        del self.element.attrib[attr]
+            applyTransponderValues(self.element, self.getValues())
         
-        self.close()
+        self.close(self.element)
 
 def main(session, **kwargs):
     session.open(CiefpSatelliteXmlReader)
 
+def browse(session, **kwargs):
+    def browserClosed(compact=None):
+        if compact is not None:
+            session.open(CiefpSatelliteXmlReader, compact)
+    session.openWithCallback(browserClosed, CiefpSatelliteXmlBrowser)
+
 def Plugins(**kwargs):
-    return PluginDescriptor(
-        name="{0} v{1}".format(PLUGIN_NAME, PLUGIN_VERSION),
-        description="Edit satellites.xml file",
-        icon=PLUGIN_ICON,
-        where=PluginDescriptor.WHERE_PLUGINMENU,
-        fnc=main
-    )
\ No newline at end of file
+    return [
+        PluginDescriptor(
+            name="{0} v{1}".format(PLUGIN_NAME, PLUGIN_VERSION),
+            description="Edit satellites.xml file",
+            icon=PLUGIN_ICON,
+            where=PluginDescriptor.WHERE_PLUGINMENU,
+            fnc=main
+        ),
+        PluginDescriptor(
+            name="{0} v{1} (browse, low memory)".format(PLUGIN_NAME, PLUGIN_VERSION),
+            description="Browse satellites.xml with a compact read-only list",
+            icon=PLUGIN_ICON,
+            where=PluginDescriptor.WHERE_PLUGINMENU,
+            fnc=browse
+        )
+    ]
@@ -0,0 +1,533 @@
+"""satellites.xml model, loader, formatter, sorter, writer and matcher.
+
+Pure Python: nothing here imports enigma, so it can be timed and used off-box.
+"""
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+import filecmp
+import os
+import re
+import shutil
+import zlib
+from datetime import datetime
+
+SATELLITES_XML_PATH = "/etc/tuxbox/satellites.xml"
+SATELLITES_XML_PATH_ENIGMA2 = "/etc/enigma2/satellites.xml"
+
+POLARIZATION = {"0": "Horizontal", "1": "Vertical", "2": "Left", "3": "Right"}
+FEC_INNER = {"0": "Auto", "1": "1/2", "2": "2/3", "3": "3/4", "4": "5/6", "5": "7/8", "6": "8/9", "7": "3/5", "8": "4/5", "9": "9/10"}
+SYSTEM = {"0": "DVB-S", "1": "DVB-S2", "2": "None"}
+MODULATION = {"0": "Auto", "1": "QPSK", "2": "8PSK", "3": "QAM16", "4": "16APSK", "5": "32APSK", "6": "None"}
+PLS_MODE = {"0": "Root", "1": "Gold", "2": "Auto", "3": "Unknown"}
+
+TRANSPONDER_ATTRS = ("frequency", "symbol_rate", "polarization", "fec_inner", "system", "modulation")
+MIS_ATTRS = ("is_id", "pls_code", "pls_mode")
+T2MI_ATTRS = ("t2mi_plp_id", "t2mi_pid")
+FREQ_TOLERANCE = 3  # MHz, frontend frekvencija cesto odstupa od XML vrijednosti
+PARSE_CHUNK = 65536
+HASH_BLOCK = 65536
+XML_ENCODING = re.compile(rb"""<\?xml[^>]*?encoding=["']([A-Za-z0-9._-]+)["']""")
+SAT_SCAN = re.compile(rb"<!--|<\?|<sat[\s/>]")
+SAT_START_TAG = re.compile(rb"""<sat(?:[^>"']|"[^"]*"|'[^']*')*>""")
+SAT_NESTED = re.compile(rb"<!--|<!\[CDATA\[|<sat[\s/>]")
+
+
+# --- model / matcher ---
+
+def transponderKey(trans):
+    return (int(trans.get("frequency", "0")) // 1000,
+            int(trans.get("symbol_rate", "0")) // 1000,
+            int(trans.get("polarization", "0")),
+            int(trans.get("fec_inner", "0")),
+            int(trans.get("system", "0")),
+            int(trans.get("modulation", "0")),
+            max(int(trans.get("is_id", "0")), 0))
+
+def tuningKey(data):
+    return (data["frequency"], data["symbol_rate"], data["polarization"], data["fec_inner"],
+            data["system"], data["modulation"], data.get("is_id", 0))
+
+
+class SatellitesModel:
+    def __init__(self, tree, keys=None):
+        self.tree = tree
+        self.root = tree.getroot()
+        self.source = None  # fileSignature() datoteke iz koje je stablo ucitano
+        self.origin = {}  # element ispod korijena -> redni broj u izvornoj datoteci
+        self.sourceHashes = []  # crc32 svakog bloka ispod korijena izvorne datoteke, po rednom broju
+        self.dirty = set()  # sateliti promijenjeni od ucitavanja / zadnjeg spremanja
+        self.modified = False
+        self.buildIndex(keys)
+
+    def setSource(self, signature, hashes=None):
+        self.source = signature
+        self.origin = {elem: i for i, elem in enumerate(self.root)}
+        self.sourceHashes = hashes or []
+        self.dirty = set()
+        self.modified = False
+
+    def markDirty(self, sat):
+        self.dirty.add(sat)
+        self.modified = True
+
+    def isModified(self):
+        return self.modified or self.source is None
+
+    def satellites(self):
+        return self.root.findall("sat")
+
+    def buildIndex(self, keys=None):
+        # keys: gotovi transponderKey() rezultati (npr. iz snapshota), preskace int() parsiranje
+        self.satIndex = {}
+        self.transIndex = {}
+        self.freqIndex = {}
+        self.transKeys = {}
+        self.parents = {}
+        for sat in self.root.findall("sat"):
+            self.indexSatellite(sat, keys)
+
+    def indexSatellite(self, sat, keys=None):
+        self.satIndex.setdefault(int(sat.get("position", "0")), sat)
+        self.transIndex[sat] = {}
+        self.freqIndex[sat] = {}
+        for trans in sat.findall("transponder"):
+            self.indexTransponder(sat, trans, keys[trans] if keys else None)
+
+    def unindexSatellite(self, sat):
+        pos = int(sat.get("position", "0"))
+        if self.satIndex.get(pos) is sat:
+            del self.satIndex[pos]
+        for same_freq in self.freqIndex.pop(sat, {}).values():
+            for trans in same_freq:
+                self.transKeys.pop(trans, None)
+                self.parents.pop(trans, None)
+        self.transIndex.pop(sat, None)
+
+    def indexTransponder(self, sat, trans, key=None):
+        if key is None:
+            key = transponderKey(trans)
+        self.transKeys[trans] = key
+        self.parents[trans] = sat
+        self.transIndex[sat].setdefault(key, trans)
+        self.freqIndex[sat].setdefault(key[0], []).append(trans)
+
+    def unindexTransponder(self, sat, trans):
+        key = self.transKeys.pop(trans, None)
+        if key is None:
+            return
+        self.parents.pop(trans, None)
+        if self.transIndex[sat].get(key) is trans:
+            del self.transIndex[sat][key]
+        same_freq = self.freqIndex[sat].get(key[0], [])
+        if trans in same_freq:
+            same_freq.remove(trans)
+        if not same_freq:
+            self.freqIndex[sat].pop(key[0], None)
+
+    def transponderCount(self):
+        return len(self.transKeys)
+
+    def removeSatellite(self, sat):
+        self.root.remove(sat)
+        self.unindexSatellite(sat)
+        self.dirty.discard(sat)
+        self.modified = True
+
+    def removeTransponder(self, trans):
+        sat = self.parents[trans]
+        sat.remove(trans)
+        self.unindexTransponder(sat, trans)
+        self.markDirty(sat)
+        return sat
+
+    def addTransponder(self, sat, trans):
+        index = insertTransponder(sat, trans)
+        self.indexTransponder(sat, trans)
+        self.markDirty(sat)
+        return index
+
+    def insertElement(self, parent, index, elem):
+        # Vraca obrisani satelit ili transponder na njegovo mjesto (undo/redo)
+        parent.insert(index, elem)
+        if parent is self.root:
+            # Vraceni satelit se serijalizira iz stabla: mogao je biti izmijenjen prije brisanja
+            self.indexSatellite(elem)
+            self.markDirty(elem)
+        else:
+            self.indexTransponder(parent, elem)
+            self.markDirty(parent)
+
+    def removeElement(self, parent, elem):
+        if parent is self.root:
+            self.removeSatellite(elem)
+        else:
+            self.removeTransponder(elem)
+
+    def reorderTransponders(self, sat, transponders):
+        sat[:] = transponders
+        self.markDirty(sat)
+
+    def updateTransponder(self, trans):
+        sat = self.parents[trans]
+        self.unindexTransponder(sat, trans)
+        self.indexTransponder(sat, trans)
+        self.markDirty(sat)
+
+    def findSatellite(self, position):
+        return self.satIndex.get(position)
+
+    def findTransponder(self, sat, data):
+        key = tuningKey(data)
+        trans = self.transIndex.get(sat, {}).get(key)
+        if trans is not None:
+            return trans
+        # Tolerantno trazenje najblize frekvencije iste polarizacije
+        best = None
+        best_score = None
+        freq_map = self.freqIndex.get(sat, {})
+        for delta in range(-FREQ_TOLERANCE, FREQ_TOLERANCE + 1):
+            for cand in freq_map.get(key[0] + delta, ()):
+                cand_key = self.transKeys[cand]
+                if cand_key[2] != key[2]:
+                    continue
+                mismatches = sum(1 for a, b in zip(cand_key[1:], key[1:]) if a != b)
+                score = (abs(delta), mismatches)
+                if best_score is None or score < best_score:
+                    best, best_score = cand, score
+        return best
+
+
+# --- loader ---
+
+def fileSignature(path):
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        crc = zlib.crc32(f.read(HASH_BLOCK))
+        if st.st_size > HASH_BLOCK:
+            f.seek(max(st.st_size - HASH_BLOCK, HASH_BLOCK))
+            crc = zlib.crc32(f.read(HASH_BLOCK), crc)
+    return (st.st_mtime_ns, st.st_size, crc)
+
+def readSatellitesXml(path=SATELLITES_XML_PATH, progress=None):
+    """Jedno citanje datoteke: (potpis, stablo, crc32 svakog bloka ispod korijena)."""
+    signature = fileSignature(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    # progress(postotak) se poziva nakon svakog parsiranog bloka
+    size = max(len(data), 1)
+    parser = ET.XMLParser()
+    for start in range(0, len(data), PARSE_CHUNK):
+        parser.feed(data[start:start + PARSE_CHUNK])
+        if progress is not None:
+            progress(min(start + PARSE_CHUNK, size) * 100 // size)
+    tree = ET.ElementTree(parser.close())
+    return signature, tree, blockHashes(data, list(tree.getroot()))
+
+def loadSatellites(path=SATELLITES_XML_PATH, progress=None):
+    signature, tree, hashes = readSatellitesXml(path, progress)
+    model = SatellitesModel(tree)
+    model.setSource(signature, hashes)
+    return model
+
+
+# --- formatter ---
+
+def formatSatellite(sat, expanded=False):
+    marker = "[-]" if expanded else "[+]"
+    return f"{marker} Satellite: {sat.get('name')} ({sat.get('position')})"
+
+def formatTransponder(trans):
+    freq = int(trans.get("frequency", "0")) // 1000
+    sr = int(trans.get("symbol_rate", "0")) // 1000
+    pol = POLARIZATION.get(trans.get("polarization", "0"), "Unknown")
+    fec = FEC_INNER.get(trans.get("fec_inner", "0"), "Unknown")
+    sys = SYSTEM.get(trans.get("system", "0"), "Unknown")
+    mod = MODULATION.get(trans.get("modulation", "0"), "Unknown")
+
+    extra = []
+    is_id = trans.get("is_id")
+    pls_mode = trans.get("pls_mode")
+    pls_code = trans.get("pls_code")
+    t2mi_plp_id = trans.get("t2mi_plp_id")
+    t2mi_pid = trans.get("t2mi_pid")
+
+    if is_id and int(is_id) > 0:
+        extra.append(f"MIS: is_id={is_id}, pls_mode={PLS_MODE.get(pls_mode, 'Unknown')}, pls_code={pls_code}")
+    if t2mi_plp_id and int(t2mi_plp_id) >= 0:
+        extra.append(f"T2-MI: plp_id={t2mi_plp_id}, pid={t2mi_pid or '0'}")
+
+    display_text = f"  TR: {freq} {pol} {sr} {fec} {sys} {mod}"
+    if extra:
+        display_text += f" [{' | '.join(extra)}]"
+    return display_text
+
+
+# --- sorter ---
+
+def applyTransponderValues(trans, values):
+    # values: atribut -> string, kako ih vraca CiefpSatelliteXmlEditor
+    for attr in TRANSPONDER_ATTRS:
+        trans.set(attr, values[attr])
+    if int(values.get("is_id", "0")) > 0:
+        for attr in MIS_ATTRS:
+            trans.set(attr, values[attr])
+    else:
+        for attr in MIS_ATTRS:
+            trans.attrib.pop(attr, None)
+    if int(values.get("t2mi_plp_id", "-1")) >= 0:
+        for attr in T2MI_ATTRS:
+            trans.set(attr, values[attr])
+    else:
+        for attr in T2MI_ATTRS:
+            trans.attrib.pop(attr, None)
+    return trans
+
+def findInsertIndex(sat, frequency):
+    # Binarno trazenje pozicije: iza svih transpondera s manjom ili jednakom frekvencijom
+    low, high = 0, len(sat)
+    while low < high:
+        mid = (low + high) // 2
+        if frequency < int(sat[mid].get("frequency", "0")):
+            high = mid
+        else:
+            low = mid + 1
+    return low
+
+def insertTransponder(sat, trans):
+    index = findInsertIndex(sat, int(trans.get("frequency", "0")))
+    sat.insert(index, trans)
+    return index
+
+def sortedByFrequency(sat):
+    # Stabilno: transponderi iste frekvencije zadrzavaju medjusobni redoslijed
+    return sorted(sat.findall("transponder"), key=lambda trans: int(trans.get("frequency", "0")))
+
+def duplicateGroup(model, trans):
+    """Sve sto razlikuje dva transpondera osim frekvencije; isti kljuc uz istu frekvenciju je duplikat."""
+    return (model.transKeys[trans][1:], trans.get("pls_code", ""), trans.get("t2mi_plp_id", ""),
+            trans.get("t2mi_pid", ""))
+
+
+def findDuplicates(model, sat, tolerance=FREQ_TOLERANCE):
+    """Sort-and-sweep: transponderi s istim ostalim parametrima unutar tolerancije frekvencije (MHz).
+
+    Od svake skupine ostaje onaj s najnizom frekvencijom, kod iste frekvencije prvi u datoteci.
+    """
+    entries = []
+    for i, trans in enumerate(sat.findall("transponder")):
+        entries.append((duplicateGroup(model, trans), model.transKeys[trans][0], i, trans))
+    entries.sort(key=lambda entry: entry[:3])
+    duplicates = []
+    kept_group = kept_freq = None
+    for group, freq, i, trans in entries:
+        if group == kept_group and freq - kept_freq <= tolerance:
+            duplicates.append(trans)
+        else:
+            kept_group, kept_freq = group, freq
+    return duplicates
+
+
+# --- writer ---
+
+def escapeXml(value):
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        value = value.replace("&", "&amp;").replace("<", "&lt;").replace('"', "&quot;").replace(">", "&gt;")
+    return value
+
+def iterXmlLines(elem, depth=0, progress=None, reuse=None):
+    # reuse: {dijete: gotov tekst} za blokove koji se prepisuju doslovno
+    # Isti izlaz kao ranije minidom toprettyxml: tab uvlaka, prazni tekst se izostavlja
+    indent = "\t" * depth
+    attrs = "".join([f' {key}="{escapeXml(value)}"' for key, value in elem.attrib.items()])
+    text = elem.text if elem.text and elem.text.strip() else ""
+    if len(elem):
+        yield f"{indent}<{elem.tag}{attrs}>"
+        if text:
+            yield f"{indent}\t{escapeXml(text.strip())}"
+        count = len(elem)
+        for i, child in enumerate(elem):
+            if reuse and child in reuse:
+                yield f"{indent}\t{reuse[child]}"
+            else:
+                yield from iterXmlLines(child, depth + 1)
+            if progress is not None:
+                progress((i + 1) * 100 // count)
+        yield f"{indent}</{elem.tag}>"
+    elif text:
+        yield f"{indent}<{elem.tag}{attrs}>{escapeXml(text)}</{elem.tag}>"
+    else:
+        yield f"{indent}<{elem.tag}{attrs}/>"
+
+def replaceFile(tmp_path, path):
+    # fsync pa rename: nestanak struje nikad ne ostavlja odsjecen satellites.xml
+    with open(tmp_path, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    try:
+        dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+def writeSatellitesXml(root, path, progress=None):
+    writeXmlLines(iterXmlLines(root, progress=progress), path)
+
+def xmlEncoding(data):
+    match = XML_ENCODING.search(data, 0, 256)
+    return match.group(1).decode("ascii") if match else "utf-8"
+
+def satRanges(data):
+    """Bajtni rasponi [(pocetak, kraj)] <sat> blokova bez parsiranja transpondera; None za neobicnu strukturu."""
+    ranges = []
+    pos = 0
+    while True:
+        match = SAT_SCAN.search(data, pos)
+        if match is None:
+            return ranges
+        token = match.group()
+        if token == b"<!--":
+            pos = data.find(b"-->", match.end())
+        elif token == b"<?":
+            pos = data.find(b"?>", match.end())
+        else:
+            tag = SAT_START_TAG.match(data, match.start())
+            if tag is None:
+                return None
+            if data.endswith(b"/>", 0, tag.end()):
+                ranges.append((match.start(), tag.end()))
+                pos = tag.end()
+                continue
+            # Komentar ili ugnijezdeni <sat> unutar bloka: prepusti expatu
+            close = data.find(b"</sat", tag.end())
+            if close == -1 or SAT_NESTED.search(data, tag.end(), close):
+                return None
+            pos = data.find(b">", close) + 1
+            ranges.append((match.start(), pos))
+        if pos <= 0:
+            return None
+
+def childRanges(data):
+    """Bajtni rasponi [(pocetak, kraj)] svih elemenata ispod korijena, preko expata."""
+    parser = expat.ParserCreate()
+    ranges = []
+    state = {"depth": 0, "start": 0}
+
+    def startElement(name, attrs):
+        state["depth"] += 1
+        if state["depth"] == 2:
+            state["start"] = parser.CurrentByteIndex
+
+    def endElement(name):
+        if state["depth"] == 2:
+            # Kod </sat> indeks pokazuje na pocetak zatvarajuceg taga, kod <sat/> na kraj elementa
+            end = parser.CurrentByteIndex
+            if data.startswith(b"</", end):
+                end = data.index(b">", end) + 1
+            ranges.append((state["start"], end))
+        state["depth"] -= 1
+
+    parser.StartElementHandler = startElement
+    parser.EndElementHandler = endElement
+    parser.Parse(data, True)
+    return ranges
+
+def blockRanges(data, children):
+    # children: elementi ispod korijena istim redom kao u data; None ako se rasponi ne poklapaju
+    ranges = None
+    if all(elem.tag == "sat" for elem in children):
+        ranges = satRanges(data)
+    if ranges is None or len(ranges) != len(children):
+        ranges = childRanges(data)
+    return ranges if len(ranges) == len(children) else None
+
+def blockHashes(data, children):
+    """crc32 izvornih bajtova svakog bloka ispod korijena; prazna lista ako se ne mogu odrediti."""
+    try:
+        ranges = blockRanges(data, children)
+    except expat.ExpatError:
+        return []
+    if ranges is None:
+        return []
+    return [zlib.crc32(data[start:end]) for start, end in ranges]
+
+def sourceBlocks(model, path):
+    """{sat: izvorni tekst} za nepromijenjene satelite, ako datoteka jos odgovara ucitanoj."""
+    if model.source is None or not model.origin or not os.path.exists(path) or fileSignature(path) != model.source:
+        return {}
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        ranges = blockRanges(data, sorted(model.origin, key=model.origin.get))
+        if ranges is None:
+            return {}
+        encoding = xmlEncoding(data)
+        blocks = {}
+        for elem in model.root:
+            i = model.origin.get(elem)
+            if i is not None and elem not in model.dirty:
+                start, end = ranges[i]
+                blocks[elem] = data[start:end].decode(encoding)
+        return blocks
+    except (expat.ExpatError, LookupError, UnicodeDecodeError, OSError) as e:
+        print(f"[CiefpSatelliteXmlEditor] Full rewrite of {path}: {str(e)}")
+        return {}
+
+def writeSatellitesModel(model, path=SATELLITES_XML_PATH, progress=None):
+    # Samo promijenjeni sateliti se ponovno serijaliziraju, ostali se kopiraju iz izvorne datoteke
+    reuse = sourceBlocks(model, path)
+    writeXmlLines(iterXmlLines(model.root, progress=progress, reuse=reuse), path)
+    signature = fileSignature(path)
+    with open(path, "rb") as f:
+        model.setSource(signature, blockHashes(f.read(), list(model.root)))
+    return len(reuse)
+
+def writeXmlLines(lines, path):
+    path = os.path.realpath(path)
+    tmp_path = path + ".tmp"
+    current_date = datetime.now().strftime("%d.%m.%Y")
+    try:
+        with open(tmp_path, "w", encoding="iso-8859-1", errors="xmlcharrefreplace") as f:
+            f.write(f"""<?xml version="1.0" encoding="iso-8859-1"?>
+<!--
+\tFile edited by ciefp satellite.xml editor, {current_date}
+-->
+""")
+            f.write(next(lines))
+            for line in lines:
+                f.write("\n" + line)
+        replaceFile(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def writeFileAtomic(data, path):
+    path = os.path.realpath(path)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        replaceFile(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def copyFileAtomic(src, dst):
+    # Vraca False ako odrediste vec ima isti sadrzaj (nema nepotrebnog pisanja po flashu)
+    src = os.path.realpath(src)
+    dst = os.path.realpath(dst)
+    if src == dst or (os.path.exists(dst) and filecmp.cmp(src, dst, shallow=False)):
+        return False
+    tmp_path = dst + ".tmp"
+    try:
+        shutil.copyfile(src, tmp_path)
+        replaceFile(tmp_path, dst)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
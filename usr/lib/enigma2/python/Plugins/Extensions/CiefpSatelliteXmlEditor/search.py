@@ -0,0 +1,182 @@
+"""Search and filter over every satellite and transponder.
+
+SearchIndex precomputes per-field indexes from the model's tuning keys
+(sorted frequency lists per satellite, a sorted symbol-rate list and integer
+bitsets per enum value), so every criterion is a bisect or a bitwise AND.
+"""
+import re
+from bisect import bisect_left, bisect_right
+
+from .satxml import POLARIZATION, SYSTEM, MODULATION
+
+ENUM_FIELDS = {"polarization": 2, "fec_inner": 3, "system": 4, "modulation": 5}  # polje -> mjesto u transponderKey
+ORBITAL_POSITION = re.compile(r"(\d{1,3})(?:\.(\d))?([ew])$")
+
+
+def idsToBits(ids, size):
+    bits = bytearray((size + 7) // 8)
+    for i in ids:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, "little")
+
+
+def orbitalPosition(text):
+    """'19.2E' -> '192', '5.0W' -> '-50' (desetinke stupnja kao u position=), inace None."""
+    match = ORBITAL_POSITION.match(text.lower())
+    if match is None:
+        return None
+    tenths = int(match.group(1)) * 10 + int(match.group(2) or 0)
+    return str(-tenths if match.group(3) == "w" else tenths)
+
+
+class SearchIndex:
+    def __init__(self, model):
+        self.transponders = []
+        self.satRanges = []
+        self.freqs = {}
+        enum_ids = {field: {} for field in ENUM_FIELDS}
+        mis_ids = []
+        t2mi_ids = []
+        sr_pairs = []
+        for sat in model.satellites():
+            start = len(self.transponders)
+            freq_pairs = []
+            for trans in sat.findall("transponder"):
+                i = len(self.transponders)
+                key = model.transKeys[trans]
+                self.transponders.append(trans)
+                freq_pairs.append((key[0], i))
+                sr_pairs.append((key[1], i))
+                for field, pos in ENUM_FIELDS.items():
+                    enum_ids[field].setdefault(key[pos], []).append(i)
+                if key[6] > 0:
+                    mis_ids.append(i)
+                t2mi_plp_id = trans.get("t2mi_plp_id")
+                if t2mi_plp_id and t2mi_plp_id.isdigit():
+                    t2mi_ids.append(i)
+            freq_pairs.sort()
+            self.freqs[sat] = ([f for f, i in freq_pairs], [i for f, i in freq_pairs])
+            self.satRanges.append((sat, start, len(self.transponders)))
+        size = len(self.transponders)
+        self.size = size
+        self.all = (1 << size) - 1
+        sr_pairs.sort()
+        self.srValues = [sr for sr, i in sr_pairs]
+        self.srIds = [i for sr, i in sr_pairs]
+        self.enumBits = {field: {value: idsToBits(ids, size) for value, ids in values.items()}
+                         for field, values in enum_ids.items()}
+        self.misBits = idsToBits(mis_ids, size)
+        self.t2miBits = idsToBits(t2mi_ids, size)
+
+    def satelliteBits(self, prefix):
+        prefix = prefix.lower()
+        position = orbitalPosition(prefix)
+        bits = 0
+        sats = []
+        for sat, start, end in self.satRanges:
+            # Pocetak imena ili bilo koje rijeci u imenu ("Hot Bird" u "13.0E Hot Bird"), pozicija kao 19.2E,
+            # ili pocetak sirove vrijednosti position= ("192")
+            name = sat.get("name", "").lower()
+            sat_position = sat.get("position", "")
+            if (name.startswith(prefix) or f" {prefix}" in name or sat_position == position
+                    or sat_position.startswith(prefix)):
+                bits |= ((1 << end) - 1) ^ ((1 << start) - 1)
+                sats.append(sat)
+        return bits, sats
+
+    def frequencyBits(self, low, high, sats):
+        ids = []
+        for sat in sats:
+            freqs, sat_ids = self.freqs[sat]
+            ids.extend(sat_ids[bisect_left(freqs, low):bisect_right(freqs, high)])
+        return idsToBits(ids, self.size)
+
+    def search(self, query):
+        """query: dict kakav vraca parseQuery(); vraca [(sat, [transponder, ...]), ...]"""
+        mask = self.all
+        sats = [sat for sat, start, end in self.satRanges]
+        if "sat" in query:
+            bits, sats = self.satelliteBits(query["sat"])
+            mask &= bits
+        for field in ENUM_FIELDS:
+            if field in query:
+                mask &= self.enumBits[field].get(query[field], 0)
+        if query.get("mis"):
+            mask &= self.misBits
+        if query.get("t2mi"):
+            mask &= self.t2miBits
+        if "symbol_rate" in query and mask:
+            low, high = query["symbol_rate"]
+            mask &= idsToBits(self.srIds[bisect_left(self.srValues, low):bisect_right(self.srValues, high)], self.size)
+        if "frequency" in query and mask:
+            mask &= self.frequencyBits(query["frequency"][0], query["frequency"][1], sats)
+        results = []
+        for sat, start, end in self.satRanges:
+            sub = (mask >> start) & ((1 << (end - start)) - 1)
+            if not sub:
+                continue
+            matches = []
+            while sub:
+                low_bit = sub & -sub
+                matches.append(self.transponders[start + low_bit.bit_length() - 1])
+                sub ^= low_bit
+            results.append((sat, matches))
+        return results
+
+
+def parseRange(value):
+    low, sep, high = value.partition("-")
+    low = int(low) if low else 0
+    if not sep:
+        return low, low
+    return low, int(high) if high else 1 << 31
+
+
+def enumValue(choices, value):
+    value = value.lower()
+    for key, name in choices.items():
+        if name.lower() == value or key == value:
+            return int(key)
+    raise ValueError(f"Unknown value: {value}")
+
+
+def parseQuery(text):
+    """Npr. 'f:10700-11700 pol:v s2 mod:8psk sr:20000- mis t2mi sat:19.2E'
+
+    Slobodne rijeci (i sat:) spajaju se u jedan prefiks imena satelita, npr. 'Hot Bird'.
+    """
+    query = {}
+    names = []
+    for token in text.split():
+        name, sep, value = token.partition(":")
+        name = name.lower()
+        try:
+            if sep and name in ("f", "freq", "frequency"):
+                query["frequency"] = parseRange(value)
+            elif sep and name in ("sr", "symbol_rate"):
+                query["symbol_rate"] = parseRange(value)
+            elif sep and name in ("pol", "polarization"):
+                short = {"h": "0", "v": "1", "l": "2", "r": "3"}
+                query["polarization"] = enumValue(POLARIZATION, short.get(value.lower(), value))
+            elif sep and name in ("sys", "system"):
+                query["system"] = enumValue(SYSTEM, value if value.lower().startswith("dvb") else "dvb-" + value)
+            elif sep and name in ("mod", "modulation"):
+                query["modulation"] = enumValue(MODULATION, value)
+            elif sep and name == "sat":
+                names.append(value)
+            elif name in ("s", "dvb-s", "s2", "dvb-s2"):
+                query["system"] = 1 if name.endswith("2") else 0
+            elif name == "mis":
+                query["mis"] = True
+            elif name in ("t2mi", "t2-mi"):
+                query["t2mi"] = True
+            elif sep or "=" in token:
+                # Nepoznat naziv:vrijednost (ili tipfeler kao pol=v) nije ime satelita
+                raise ValueError(token)
+            else:
+                names.append(token)
+        except ValueError:
+            raise ValueError(f"Invalid search term: {token}")
+    if names:
+        query["sat"] = " ".join(names)
+    return query
@@ -0,0 +1,61 @@
+"""On-disk snapshot of the satellites.xml index keys.
+
+The snapshot is trusted only while the XML file's mtime, size and a CRC of
+its head and tail still match. Rebuilding Elements in Python is slower than
+the C expat parser, so the tree is still parsed; only the per-transponder
+int() key parsing is taken from the snapshot. Row strings are not stored:
+the reader formats just the rows around the viewport.
+"""
+import marshal
+import os
+
+from .satxml import SATELLITES_XML_PATH, SatellitesModel, fileSignature, loadSatellites, readSatellitesXml
+
+SNAPSHOT_PATH = "/tmp/CiefpSatelliteXmlEditor.snapshot"
+SNAPSHOT_VERSION = 2
+
+
+def iterTransponders(root):
+    for sat in root.findall("sat"):
+        yield from sat.findall("transponder")
+
+
+def saveSnapshot(model, xml_path=SATELLITES_XML_PATH, snapshot_path=SNAPSHOT_PATH):
+    keys = [model.transKeys[trans] for trans in iterTransponders(model.root)]
+    tmp_path = snapshot_path + ".tmp"
+    try:
+        data = (SNAPSHOT_VERSION, fileSignature(xml_path), keys)
+        with open(tmp_path, "wb") as f:
+            f.write(marshal.dumps(data))
+        os.replace(tmp_path, snapshot_path)
+    except OSError as e:
+        print(f"[CiefpSatelliteXmlEditor] Error writing snapshot: {str(e)}")
+        return False
+    return True
+
+
+def loadSnapshot(xml_path=SATELLITES_XML_PATH, snapshot_path=SNAPSHOT_PATH, progress=None):
+    try:
+        with open(snapshot_path, "rb") as f:
+            version, signature, keys = marshal.loads(f.read())
+        if version != SNAPSHOT_VERSION or signature != fileSignature(xml_path):
+            return None
+    except Exception:
+        return None
+    current, tree, hashes = readSatellitesXml(xml_path, progress)
+    transponders = list(iterTransponders(tree.getroot()))
+    if current != signature or len(transponders) != len(keys):
+        return None
+    model = SatellitesModel(tree, dict(zip(transponders, keys)))
+    model.setSource(signature, hashes)
+    return model
+
+
+def loadSatellitesCached(xml_path=SATELLITES_XML_PATH, snapshot_path=SNAPSHOT_PATH, progress=None):
+    cached = loadSnapshot(xml_path, snapshot_path, progress)
+    if cached is not None:
+        print(f"[CiefpSatelliteXmlEditor] Loaded snapshot {snapshot_path}")
+        return cached
+    model = loadSatellites(xml_path, progress)
+    saveSnapshot(model, xml_path, snapshot_path)
+    return model
@@ -0,0 +1,115 @@
+"""One-pass validation of every transponder in the model.
+
+Numeric checks run on the model's cached tuning keys and allowed
+combinations are precomputed sets, so a transponder costs a handful of
+tuple and set lookups; only the rare MIS/T2-MI attributes are read from the
+element itself.
+"""
+from .satxml import duplicateGroup
+
+ERROR = "error"
+WARNING = "warning"
+
+C_BAND = (3000, 4800)  # MHz, ukljucujuci prosireni C
+KU_BAND = (10700, 12750)
+SYMBOL_RATES = {0: (1000, 45000), 1: (100, 72000)}  # kS/s po sustavu (DVB-S, DVB-S2)
+POLARIZATIONS = frozenset(range(4))
+
+# Dopustene kombinacije (system, modulation, fec_inner); fec 0 i modulation 0 su Auto
+DVB_S_FEC = (0, 1, 2, 3, 4, 5)
+DVB_S2_FEC = {
+    1: (0, 1, 2, 3, 4, 6, 7, 8, 9),  # QPSK
+    2: (0, 2, 3, 4, 6, 7, 9),  # 8PSK
+    4: (0, 2, 3, 4, 6, 8, 9),  # 16APSK
+    5: (0, 3, 4, 6, 8, 9),  # 32APSK
+    0: tuple(range(10)),
+}
+VALID_COMBOS = frozenset([(0, modulation, fec) for modulation in (0, 1) for fec in DVB_S_FEC] +
+                         [(1, modulation, fec) for modulation, fecs in DVB_S2_FEC.items() for fec in fecs])
+
+PLS_MODES = frozenset(["0", "1", "2", "3"])
+PLS_CODE_MAX = 262143  # 18 bita
+BYTE_VALUES = frozenset([str(i) for i in range(256)])
+PID_VALUES = frozenset([str(i) for i in range(8192)])
+
+
+class ValidationResult:
+    def __init__(self):
+        self.issues = {}  # transponder -> [(razina, poruka), ...]
+
+    def add(self, trans, level, message):
+        self.issues.setdefault(trans, []).append((level, message))
+
+    def clearSatellite(self, sat):
+        for trans in sat:
+            self.issues.pop(trans, None)
+
+    def text(self, trans):
+        issues = self.issues.get(trans)
+        if not issues:
+            return ""
+        mark = "!" if any(level == ERROR for level, message in issues) else "?"
+        return f"  {mark} " + ", ".join([message for level, message in issues])
+
+    def counts(self):
+        errors = sum(1 for issues in self.issues.values() if any(level == ERROR for level, message in issues))
+        return errors, len(self.issues) - errors
+
+    def summary(self):
+        errors, warnings = self.counts()
+        return f"{errors} transponders with errors, {warnings} with warnings"
+
+
+def validateSatellite(model, sat, result):
+    keys = model.transKeys
+    seen = set()
+    previous_freq = 0
+    c_low, c_high = C_BAND
+    ku_low, ku_high = KU_BAND
+    for trans in sat.findall("transponder"):
+        key = keys[trans]
+        freq, sr, pol, fec, system, modulation, is_id = key
+        if freq == 0:
+            result.add(trans, ERROR, "no frequency")
+        elif not (ku_low <= freq <= ku_high or c_low <= freq <= c_high):
+            result.add(trans, WARNING, f"{freq} MHz outside C/Ku band")
+        if freq < previous_freq:
+            result.add(trans, WARNING, "not sorted by frequency")
+        previous_freq = freq
+        sr_range = SYMBOL_RATES.get(system)
+        if sr_range is None:
+            result.add(trans, ERROR, "unknown system")
+        else:
+            if not sr_range[0] <= sr <= sr_range[1]:
+                result.add(trans, ERROR, f"symbol rate {sr} kS/s")
+            if (system, modulation, fec) not in VALID_COMBOS:
+                result.add(trans, ERROR, "modulation/FEC not valid for " + ("DVB-S" if system == 0 else "DVB-S2"))
+        if pol not in POLARIZATIONS:
+            result.add(trans, ERROR, "unknown polarization")
+        if is_id > 0:
+            if system != 1:
+                result.add(trans, ERROR, "MIS requires DVB-S2")
+            if trans.get("is_id") not in BYTE_VALUES:
+                result.add(trans, ERROR, "is_id out of range")
+            pls_code = trans.get("pls_code", "0")
+            if not pls_code.isdigit() or int(pls_code) > PLS_CODE_MAX:
+                result.add(trans, ERROR, "pls_code out of range")
+            if trans.get("pls_mode", "0") not in PLS_MODES:
+                result.add(trans, ERROR, "unknown pls_mode")
+        plp_id = trans.get("t2mi_plp_id")
+        if plp_id is not None and plp_id != "-1":
+            if plp_id not in BYTE_VALUES:
+                result.add(trans, ERROR, "t2mi_plp_id out of range")
+            if trans.get("t2mi_pid") not in PID_VALUES:
+                result.add(trans, ERROR, "t2mi_pid out of range")
+        dup_key = (freq, duplicateGroup(model, trans))
+        if dup_key in seen:
+            result.add(trans, ERROR, "duplicate transponder")
+        seen.add(dup_key)
+
+
+def validateModel(model):
+    result = ValidationResult()
+    for sat in model.satellites():
+        validateSatellite(model, sat, result)
+    return result
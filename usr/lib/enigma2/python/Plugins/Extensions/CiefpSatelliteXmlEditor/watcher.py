@@ -0,0 +1,191 @@
+"""Notice when satellites.xml is replaced by another program and reload only what changed.
+
+FileWatcher reads inotify events for the file's directory where the kernel
+offers them (atomic replaces arrive as a rename into the directory), and
+otherwise compares mtime/size; either way the check runs from a repeating
+timer on the GUI thread, passed in like BackgroundWorker's, and costs one
+syscall per tick. reloadChanged() compares the CRC of every <sat> block in
+the new file with the block it came from at load time: satellites whose
+bytes are unchanged keep their local state, changed ones are swapped in
+unless they were also edited locally, in which case the local version wins
+and the satellite is reported as a conflict.
+"""
+import ctypes
+import ctypes.util
+import os
+import struct
+
+INOTIFY_INTERVAL = 1000  # ms
+POLL_INTERVAL = 2000  # ms
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def openInotify(directory):
+    """Neblokirajuci inotify fd koji prati directory, ili None ako jezgra/libc to ne podrzava."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), INOTIFY_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class FileWatcher:
+    def __init__(self, path, timer_factory, onChange):
+        self.path = os.path.realpath(path)
+        self.name = os.fsencode(os.path.basename(self.path))
+        self.onChange = onChange
+        self.inotify = openInotify(os.path.dirname(self.path))
+        self.interval = POLL_INTERVAL if self.inotify is None else INOTIFY_INTERVAL
+        self.stat = None
+        self.timer = timer_factory()
+        self.timer.callback.append(self.poll)
+
+    def start(self):
+        self.stat = self.statFile()
+        if self.inotify is not None:
+            self.readEvents()  # odbaci dogadjaje prije pocetka pracenja
+        self.timer.start(self.interval, False)
+
+    def stop(self):
+        self.timer.stop()
+
+    def close(self):
+        self.timer.stop()
+        if self.inotify is not None:
+            os.close(self.inotify)
+            self.inotify = None
+
+    def statFile(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def readEvents(self):
+        changed = False
+        while True:
+            try:
+                data = os.read(self.inotify, 4096)
+            except OSError:  # BlockingIOError: nema novih dogadjaja
+                return changed
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                length = INOTIFY_EVENT.unpack_from(data, offset)[3]
+                start = offset + INOTIFY_EVENT.size
+                if data[start:start + length].rstrip(b"\0") == self.name:
+                    changed = True
+                offset = start + length
+
+    def poll(self):
+        if self.inotify is not None:
+            changed = self.readEvents()
+        else:
+            stat = self.statFile()
+            changed = stat != self.stat
+            self.stat = stat
+        if changed:
+            self.onChange()
+
+
+class ReloadResult:
+    def __init__(self):
+        self.replaced = []  # (stari, novi) sateliti promijenjeni izvana
+        self.added = []
+        self.removed = []
+        self.conflicts = []  # sateliti promijenjeni i lokalno i izvana; lokalna verzija ostaje
+
+    def changed(self):
+        return bool(self.replaced or self.added or self.removed)
+
+    def summary(self):
+        return (f"{len(self.replaced)} satellites reloaded, {len(self.added)} added, "
+                f"{len(self.removed)} removed, {len(self.conflicts)} conflicts")
+
+
+def satelliteKeys(elems):
+    # (pozicija, n): n razlikuje vise satelita na istoj poziciji, kao u merge.py
+    seen = {}
+    keys = []
+    for elem in elems:
+        position = elem.get("position", "0") if elem.tag == "sat" else elem.tag
+        n = seen.get(position, 0)
+        seen[position] = n + 1
+        keys.append((position, n))
+    return keys
+
+
+def reloadChanged(model, signature, tree, hashes):
+    """Unosi u model samo satelite cija se izvorna datoteka promijenila; vraca ReloadResult.
+
+    Potreban je model.sourceHashes iz ucitavanja/spremanja i hashes nove datoteke
+    (blockHashes); bez njih se ne zna sto se promijenilo i vraca se None.
+    """
+    old_children = sorted(model.origin, key=model.origin.get)
+    new_children = list(tree.getroot())
+    if (model.source is None or len(model.sourceHashes) != len(old_children)
+            or len(hashes) != len(new_children)):
+        return None
+    result = ReloadResult()
+    old = dict(zip(satelliteKeys(old_children), zip(old_children, model.sourceHashes)))
+    current = set(model.root)
+    children = []
+    origin = []  # element modela za svaki redni broj nove datoteke
+    for key, new_elem, new_hash in zip(satelliteKeys(new_children), new_children, hashes):
+        old_elem, old_hash = old.pop(key, (None, None))
+        if old_elem is None:
+            children.append(new_elem)
+            origin.append(new_elem)
+            result.added.append(new_elem)
+        elif old_hash == new_hash:
+            # Izvana nepromijenjen: zadrzi lokalno stanje (i lokalne izmjene ili brisanje)
+            if old_elem in current:
+                children.append(old_elem)
+            origin.append(old_elem)
+        elif old_elem in current and old_elem not in model.dirty:
+            children.append(new_elem)
+            origin.append(new_elem)
+            result.replaced.append((old_elem, new_elem))
+        else:
+            if old_elem in current:
+                children.append(old_elem)
+            origin.append(old_elem)
+            result.conflicts.append(old_elem)
+    for old_elem, old_hash in old.values():
+        # Izvana obrisan: lokalno izmijenjeni ostaje (na kraju), ostali se brisu
+        if old_elem not in current:
+            continue
+        if old_elem in model.dirty:
+            children.append(old_elem)
+            result.conflicts.append(old_elem)
+        else:
+            result.removed.append(old_elem)
+    # Elementi koji nisu bili u izvornoj datoteci ostaju na kraju
+    known = set(children)
+    known.update(elem for elem, new_elem in result.replaced)
+    known.update(result.removed)
+    children.extend(elem for elem in model.root if elem not in known)
+
+    for old_elem, new_elem in result.replaced:
+        model.unindexSatellite(old_elem)
+    for old_elem in result.removed:
+        model.unindexSatellite(old_elem)
+    model.root[:] = children
+    for new_elem in [new_elem for old_elem, new_elem in result.replaced] + result.added:
+        if new_elem.tag == "sat":
+            model.indexSatellite(new_elem)
+    model.source = signature
+    model.origin = {elem: i for i, elem in enumerate(origin)}
+    model.sourceHashes = hashes
+    model.modified = bool(model.dirty) or children != origin
+    return result
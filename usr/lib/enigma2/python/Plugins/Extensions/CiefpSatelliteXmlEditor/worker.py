@@ -0,0 +1,76 @@
+"""Background worker for load and save jobs.
+
+A job runs in a daemon thread and only ever talks to the GUI through a queue;
+the queue is drained by a repeating timer on the GUI thread, so callbacks run
+where enigma2 expects them. The timer class is passed in (eTimer in the
+plugin), which keeps this module importable and testable without enigma.
+"""
+import queue
+import threading
+
+POLL_INTERVAL = 50  # ms
+
+
+class BackgroundWorker:
+    def __init__(self, timer_factory, interval=POLL_INTERVAL):
+        self.timer = timer_factory()
+        self.timer.callback.append(self.poll)
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.thread = None
+        self.name = None
+        self.callbacks = None
+
+    @property
+    def running(self):
+        return self.callbacks is not None
+
+    def start(self, name, job, onDone, onError=None, onProgress=None):
+        """job(progress) se izvrsava u pozadini; progress(postotak) salje napredak GUI-u."""
+        if self.running:
+            raise RuntimeError(f"{self.name} already running")
+        self.name = name
+        self.callbacks = (onDone, onError, onProgress)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, args=(job, self.queue), name=f"CiefpSatelliteXmlEditor {name}")
+        self.thread.daemon = True
+        self.thread.start()
+        self.timer.start(self.interval, False)
+
+    def run(self, job, results):
+        try:
+            results.put(("done", job(lambda percent: results.put(("progress", percent)))))
+        except Exception as e:
+            results.put(("error", e))
+
+    def poll(self):
+        if not self.running:
+            self.timer.stop()
+            return
+        onDone, onError, onProgress = self.callbacks
+        progress = None
+        while True:
+            try:
+                kind, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                progress = value
+                continue
+            # Posao je gotov: oslobodi workera prije poziva, callback smije pokrenuti novi posao
+            self.timer.stop()
+            self.callbacks = None
+            if kind == "done":
+                onDone(value)
+            elif onError is not None:
+                onError(value)
+            else:
+                print(f"[CiefpSatelliteXmlReader] {self.name} failed: {value}")
+            return
+        if progress is not None and onProgress is not None:
+            onProgress(progress)
+
+    def cancel(self):
+        # Dretva se ne moze prekinuti; rezultat se samo odbacuje (npr. pri zatvaranju ekrana)
+        self.timer.stop()
+        self.callbacks = None